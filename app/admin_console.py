@@ -2,6 +2,7 @@
 Admin console API endpoints for managing system configuration.
 """
 from fastapi import APIRouter, HTTPException, Header, Response
+from fastapi.concurrency import run_in_threadpool
 from fastapi.responses import HTMLResponse
 from typing import Optional, Dict, Any, List
 from pydantic import BaseModel
@@ -178,7 +179,8 @@ async def test_database_connection(session_token: Optional[str] = Header(None, a
             raise HTTPException(status_code=400, detail="Database configuration section not found")
         
         db_config = config_data["database"]
-        result = test_database_from_config(db_config)
+        # Opens a blocking MySQL connection (up to 5s); keep it off the event loop
+        result = await run_in_threadpool(test_database_from_config, db_config)
         
         return result
     except HTTPException:
@@ -206,7 +208,8 @@ async def test_hsi_binary(session_token: Optional[str] = Header(None, alias="X-S
             raise HTTPException(status_code=400, detail="SDS Sync configuration section not found")
         
         sds_sync_config = config_data["sds_sync"]
-        result = test_hsi_from_config(sds_sync_config)
+        # Runs the HSI binary (up to 5s); keep it off the event loop
+        result = await run_in_threadpool(test_hsi_from_config, sds_sync_config)
         
         return result
     except HTTPException:
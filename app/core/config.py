@@ -1,5 +1,6 @@
 import configparser
 import os
+from functools import lru_cache
 from pathlib import Path
 from typing import Optional, Dict
 from pydantic import Field
@@ -50,6 +51,8 @@ class DatabaseSettings(BaseSettings):
     password: str = "<db_password>"
     db: str = "<db_name>"
     job_table: str = "userjobs"
+    pool_min_size: int = 5
+    pool_max_size: int = 20
 
 
 class LoggingSettings(BaseSettings):
@@ -96,5 +99,11 @@ class Settings(BaseSettings):
         )
 
 
+@lru_cache(maxsize=1)
+def get_settings() -> Settings:
+    """Parse sds.cfg once and return the shared Settings instance."""
+    return Settings.from_config_file()
+
+
 # Create global settings instance
-settings = Settings.from_config_file()
+settings = get_settings()
@@ -162,10 +162,16 @@ def validate_config_updates(updates: Dict[str, Dict[str, str]]) -> List[str]:
             
             # Basic type validation
             if key in ['port', 'message_broker_port', 'timeout_in_secs', 
-                      'same_job_minimum_interval_in_min', 'staging_usage_threshold_in_gb']:
+                      'same_job_minimum_interval_in_min', 'staging_usage_threshold_in_gb',
+                      'pool_min_size', 'pool_max_size']:
                 try:
-                    int(value)
+                    int_value = int(value)
                 except ValueError:
                     errors.append(f"'{key}' must be an integer, got '{value}'")
+                    continue
+                
+                # A pool without connection slots would time out every database request
+                if key in ['pool_min_size', 'pool_max_size'] and int_value < 1:
+                    errors.append(f"'{key}' must be at least 1, got '{value}'")
     
     return errors
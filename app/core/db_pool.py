@@ -0,0 +1,146 @@
+"""
+MySQL connection pool for the API endpoints.
+
+Keeps authenticated pymysql connections open between requests so handlers
+borrow a warm connection instead of paying a TCP + MySQL auth handshake per call.
+"""
+import queue
+import threading
+import time
+from contextlib import contextmanager
+from typing import Any, Dict, Iterator
+
+import pymysql
+from fastapi import FastAPI, Request
+from fastapi.responses import JSONResponse
+from pymysql.constants import SERVER_STATUS
+
+from app.core.config import settings
+from app.core.logger import logger
+
+# Idle connections older than this are pinged (and reconnected) before reuse
+PING_AFTER_IDLE_SECONDS = 30
+
+
+class ConnectionPool:
+    """
+    Thread-safe pool of pymysql connections.
+
+    Up to min_size connections are opened by prewarm() at startup, further
+    ones lazily up to max_size. Borrowed connections are returned to the pool
+    with release() instead of being closed.
+    """
+
+    def __init__(
+        self,
+        min_size: int = 5,
+        max_size: int = 20,
+        acquire_timeout: float = 10,
+        **connect_kwargs: Any
+    ):
+        self.min_size = min(min_size, max_size)
+        self.max_size = max_size
+        self.acquire_timeout = acquire_timeout
+        self.connect_kwargs: Dict[str, Any] = connect_kwargs
+        self._idle: "queue.LifoQueue[tuple]" = queue.LifoQueue()
+        self._slots = threading.BoundedSemaphore(max_size)
+
+    def _connect(self) -> pymysql.connections.Connection:
+        return pymysql.connect(**self.connect_kwargs)
+
+    def prewarm(self) -> None:
+        """Open min_size idle connections ahead of the first request."""
+        for _ in range(self.min_size - self._idle.qsize()):
+            try:
+                connection = self._connect()
+            except pymysql.MySQLError as e:
+                logger.warning("Could not pre-open database connections: %s", e)
+                return
+            self._idle.put((connection, time.monotonic()))
+
+    def get_connection(self) -> pymysql.connections.Connection:
+        """Borrow a connection, opening a new one if no idle connection is available."""
+        if not self._slots.acquire(timeout=self.acquire_timeout):
+            raise pymysql.err.OperationalError(
+                f"Timed out waiting for a database connection (pool size {self.max_size})"
+            )
+
+        try:
+            try:
+                connection, last_used = self._idle.get_nowait()
+            except queue.Empty:
+                return self._connect()
+
+            if time.monotonic() - last_used > PING_AFTER_IDLE_SECONDS:
+                connection.ping(reconnect=True)
+            return connection
+        except Exception:
+            self._slots.release()
+            raise
+
+    def release(self, connection: pymysql.connections.Connection) -> None:
+        """
+        Return a borrowed connection to the pool; broken connections are dropped.
+        A transaction left open by the borrower is rolled back so the next
+        borrower does not inherit its locks or read snapshot.
+        """
+        try:
+            if connection.open and connection.server_status & SERVER_STATUS.SERVER_STATUS_IN_TRANS:
+                connection.rollback()
+            if connection.open:
+                self._idle.put((connection, time.monotonic()))
+        except pymysql.MySQLError as e:
+            logger.warning("Dropping pooled database connection: %s", e)
+            connection.close()
+        finally:
+            self._slots.release()
+
+    @contextmanager
+    def connection(self) -> Iterator[pymysql.connections.Connection]:
+        """Borrow a connection for the duration of a with block."""
+        connection = self.get_connection()
+        try:
+            yield connection
+        finally:
+            self.release(connection)
+
+    def close_all(self) -> None:
+        """Close every idle connection (called on application shutdown)."""
+        while True:
+            try:
+                connection, _ = self._idle.get_nowait()
+            except queue.Empty:
+                break
+            try:
+                connection.close()
+            except Exception as e:
+                logger.warning("Error closing pooled database connection: %s", e)
+
+
+# Create global pool instance
+db_pool = ConnectionPool(
+    min_size=settings.database.pool_min_size,
+    max_size=settings.database.pool_max_size,
+    host=settings.database.host,
+    user=settings.database.user,
+    password=settings.database.password,
+    database=settings.database.db,
+    port=3306,
+    connect_timeout=10,
+    cursorclass=pymysql.cursors.DictCursor,
+    # Every worker write is a single statement, so commit it server-side
+    # instead of paying a separate COMMIT round trip
+    autocommit=True
+)
+
+
+def add_database_error_handler(app: FastAPI) -> None:
+    """Return a 500 response for any database error raised by an endpoint."""
+
+    @app.exception_handler(pymysql.MySQLError)
+    async def database_error_handler(request: Request, exc: pymysql.MySQLError):
+        logger.error("Database error on %s: %s", request.url.path, exc)
+        return JSONResponse(
+            status_code=500,
+            content={"detail": f"Database error: {str(exc)}"}
+        )
@@ -38,16 +38,10 @@ def test_mysql_connection(host: str, user: str, password: str, db: str, port: in
             connect_timeout=5  # 5 second timeout
         )
         
-        # Get database version and other info
+        # Get database version and other info in a single round trip
         with connection.cursor() as cursor:
-            cursor.execute("SELECT VERSION()")
-            version = cursor.fetchone()[0]
-            
-            cursor.execute("SELECT DATABASE()")
-            current_db = cursor.fetchone()[0]
-            
-            cursor.execute("SELECT USER()")
-            current_user = cursor.fetchone()[0]
+            cursor.execute("SELECT VERSION(), DATABASE(), USER()")
+            version, current_db, current_user = cursor.fetchone()
         
         result["success"] = True
         result["message"] = "Database connection successful!"
@@ -6,10 +6,11 @@ Handles creation, validation, and expiration of download tokens with
 """
 
 from datetime import datetime, timedelta
-from typing import Optional, Dict, Any
+from typing import Optional, Dict, Any, Tuple
 from enum import Enum
 import secrets
-import hashlib
+import threading
+import time
 from app.core.logger import logger
 
 
@@ -20,6 +21,15 @@ class TokenStatus(str, Enum):
     EXPIRED = "expired"
 
 
+class JobStatus(str, Enum):
+    """Job status enumeration (mirrors the user_jobs.job_status ENUM column)."""
+    SUBMITTED = "submitted"
+    PROCESSING = "processing"
+    COMPLETED = "completed"
+    FAILED = "failed"
+    CANCELLED = "cancelled"
+
+
 class DownloadToken:
     """
     Download token model with validation logic.
@@ -98,6 +108,44 @@ class DownloadToken:
             "is_valid": self.is_valid(),
             "remaining_downloads": max(0, self.max_downloads - self.download_count)
         }
+    
+    @classmethod
+    def to_api_dict(cls, row: Dict[str, Any]) -> Dict[str, Any]:
+        """
+        Serialize a token row exactly like to_dict() without building a
+        DownloadToken first. Use on read-only paths such as listing tokens.
+        
+        Args:
+            row: Token row from the database (DictCursor)
+            
+        Returns:
+            Dictionary with the same keys and values as to_dict()
+        """
+        status = TokenStatus(row["status"])
+        download_count = row["download_count"]
+        max_downloads = row["max_downloads"]
+        created_time = row["created_time"]
+        expires_at = row["expires_at"]
+        last_download_time = row.get("last_download_time")
+        
+        return {
+            "token_id": row["token_id"],
+            "token": row["token"],
+            "job_id": row["job_id"],
+            "status": status.value,
+            "download_count": download_count,
+            "max_downloads": max_downloads,
+            "created_time": created_time.isoformat() if created_time else None,
+            "expires_at": expires_at.isoformat() if expires_at else None,
+            "last_download_time": last_download_time.isoformat() if last_download_time else None,
+            "last_download_ip": row.get("last_download_ip"),
+            "is_valid": (
+                status == TokenStatus.ACTIVE
+                and datetime.now() < expires_at
+                and download_count < max_downloads
+            ),
+            "remaining_downloads": max(0, max_downloads - download_count)
+        }
 
 
 class TokenManager:
@@ -108,12 +156,10 @@ class TokenManager:
         """
         Generate a secure random token.
         
-        Creates a 32-character hex token using secrets module for cryptographic security.
+        Creates a 32-character hex token (128 random bits) using secrets module
+        for cryptographic security. job_id and user_email are not encoded in it.
         """
-        random_bytes = secrets.token_bytes(16)
-        timestamp = str(datetime.now().timestamp())
-        data = f"{job_id}:{user_email}:{timestamp}:{random_bytes.hex()}"
-        return hashlib.sha256(data.encode()).hexdigest()[:32]
+        return secrets.token_hex(16)
     
     @staticmethod
     def create_token_data(
@@ -177,22 +223,21 @@ class TokenManager:
     
     @staticmethod
     def prepare_download_update(
-        token_id: int,
+        token: str,
         client_ip: Optional[str] = None
     ) -> Dict[str, Any]:
         """
-        Prepare data for updating token after download.
+        Prepare data for recording a download against a token.
         
         Args:
-            token_id: Token ID to update
+            token: Token string to update
             client_ip: Optional client IP to record
             
         Returns:
-            Dictionary with update data
+            Dictionary with update data for the record_download query
         """
         update_data = {
-            "token_id": token_id,
-            "download_count_increment": 1,
+            "token": token,
             "last_download_time": datetime.now(),
             "last_download_ip": client_ip
         }
@@ -200,8 +245,73 @@ class TokenManager:
         return update_data
 
 
-# Example SQL queries for token operations
+class TokenCache:
+    """
+    Short-lived in-process cache of token rows for the validation path.
+    
+    Entries live for at most ttl_seconds (and never past the token's own
+    expires_at). This process drops a token's entry whenever it updates the
+    row; updates made by other workers become visible once the entry ages out.
+    Download limits are still enforced by the record_download UPDATE itself.
+    """
+    
+    def __init__(self, ttl_seconds: float = 60, max_entries: int = 10000):
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max_entries
+        self._entries: Dict[str, Tuple[float, Dict[str, Any]]] = {}
+        self._lock = threading.Lock()
+    
+    def get(self, token: str) -> Optional[Dict[str, Any]]:
+        """Return the cached token row, or None on a miss or stale entry."""
+        entry = self._entries.get(token)
+        if entry is None:
+            return None
+        if time.monotonic() >= entry[0]:
+            self.invalidate(token)
+            return None
+        return entry[1]
+    
+    def set(self, token: str, row: Dict[str, Any]) -> None:
+        """Cache a token row fetched from the database."""
+        ttl = self.ttl_seconds
+        expires_at = row.get("expires_at")
+        if expires_at is not None:
+            ttl = min(ttl, (expires_at - datetime.now()).total_seconds())
+        if ttl <= 0:
+            # Already past its expiry; make sure no older copy lingers either
+            self.invalidate(token)
+            return
+        
+        with self._lock:
+            if token not in self._entries and len(self._entries) >= self.max_entries:
+                # Evict the oldest insertion to keep memory bounded
+                self._entries.pop(next(iter(self._entries)))
+            self._entries[token] = (time.monotonic() + ttl, row)
+    
+    def invalidate(self, token: str) -> None:
+        """Drop a token's cached row after it has been modified."""
+        with self._lock:
+            self._entries.pop(token, None)
+
+
+# Create global cache instance
+token_cache = TokenCache()
+
+
+# SQL queries for job and token operations
 SQL_QUERIES = {
+    "create_job": """
+        INSERT INTO user_jobs (user_email, file_name, job_status, created_time)
+        VALUES (%(user_email)s, %(file_name)s, %(job_status)s, %(created_time)s)
+    """,
+    
+    # Used to explain why a job-scoped query matched nothing (404 vs 403 vs 400)
+    "get_job_owner": """
+        SELECT user_email, job_status
+        FROM user_jobs
+        WHERE job_id = %(job_id)s
+    """,
+    
     "create_token": """
         INSERT INTO download_tokens 
         (token, job_id, status, download_count, max_downloads, created_time, expires_at)
@@ -209,6 +319,21 @@ SQL_QUERIES = {
                 %(max_downloads)s, %(created_time)s, %(expires_at)s)
     """,
     
+    # Inserts the token only if the job exists, belongs to the user and is
+    # completed; a rowcount of 0 means one of those checks failed. The
+    # comparisons are binary so they match the exact checks of the fallback
+    # path instead of the column's case/accent-insensitive collation.
+    "create_token_if_job_valid": """
+        INSERT INTO download_tokens 
+        (token, job_id, status, download_count, max_downloads, created_time, expires_at)
+        SELECT %(token)s, job_id, %(status)s, %(download_count)s,
+               %(max_downloads)s, %(created_time)s, %(expires_at)s
+        FROM user_jobs
+        WHERE job_id = %(job_id)s
+        AND user_email = CAST(%(user_email)s AS BINARY)
+        AND job_status = CAST('completed' AS BINARY)
+    """,
+    
     "get_token": """
         SELECT token_id, token, job_id, status, download_count, max_downloads,
                created_time, expires_at, last_download_time, last_download_ip
@@ -216,12 +341,19 @@ SQL_QUERIES = {
         WHERE token = %(token)s
     """,
     
-    "update_download": """
+    # Counts a download only if the token is still usable, and expires it in
+    # the same statement once the limit is reached. MySQL applies the SET
+    # clauses left to right, so the IF() sees the incremented download_count.
+    "record_download": """
         UPDATE download_tokens
         SET download_count = download_count + 1,
             last_download_time = %(last_download_time)s,
-            last_download_ip = %(last_download_ip)s
-        WHERE token_id = %(token_id)s
+            last_download_ip = %(last_download_ip)s,
+            status = IF(download_count >= max_downloads, 'expired', status)
+        WHERE token = %(token)s
+        AND status = 'active'
+        AND expires_at > %(last_download_time)s
+        AND download_count < max_downloads
     """,
     
     "mark_expired": """
@@ -249,5 +381,18 @@ SQL_QUERIES = {
         FROM download_tokens
         WHERE job_id = %(job_id)s
         ORDER BY created_time DESC
+    """,
+    
+    # Same as get_job_tokens, but only returns rows if the job belongs to
+    # the user; an empty result needs a job lookup to tell 404/403/no tokens.
+    # The owner comparison is binary to match that lookup's exact check.
+    "get_job_tokens_with_auth": """
+        SELECT t.token_id, t.token, t.job_id, t.status, t.download_count, t.max_downloads,
+               t.created_time, t.expires_at, t.last_download_time, t.last_download_ip
+        FROM download_tokens t
+        JOIN user_jobs j ON j.job_id = t.job_id
+        WHERE j.job_id = %(job_id)s
+        AND j.user_email = CAST(%(user_email)s AS BINARY)
+        ORDER BY t.created_time DESC
     """
 }
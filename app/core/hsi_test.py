@@ -3,6 +3,7 @@ HSI binary testing utilities.
 Tests if HSI (HPSS Interface) binary exists and is executable.
 """
 import os
+import stat
 import subprocess
 from typing import Dict, Any
 
@@ -34,8 +35,13 @@ def test_hsi_binary(hsi_bin_path: str) -> Dict[str, Any]:
             }
             return result
         
-        # Check if file exists
-        if not os.path.exists(hsi_bin_path):
+        # Check if file exists (stat once and reuse the result below)
+        try:
+            st = os.stat(hsi_bin_path)
+        except OSError:
+            st = None
+        
+        if st is None:
             result["success"] = False
             result["message"] = f"HSI binary not found at path: {hsi_bin_path}"
             result["details"] = {
@@ -45,7 +51,7 @@ def test_hsi_binary(hsi_bin_path: str) -> Dict[str, Any]:
             return result
         
         # Check if it's a file
-        if not os.path.isfile(hsi_bin_path):
+        if not stat.S_ISREG(st.st_mode):
             result["success"] = False
             result["message"] = f"Path exists but is not a file: {hsi_bin_path}"
             result["details"] = {
@@ -64,15 +70,18 @@ def test_hsi_binary(hsi_bin_path: str) -> Dict[str, Any]:
                 "exists": True,
                 "is_file": True,
                 "is_executable": False,
-                "permissions": oct(os.stat(hsi_bin_path).st_mode)[-3:]
+                "permissions": oct(st.st_mode)[-3:]
             }
             return result
         
         # Try to get version or basic info
         try:
+            # Only stdout is inspected; discard stderr instead of piping it
             proc = subprocess.run(
                 [hsi_bin_path, '-?'],
-                capture_output=True,
+                stdout=subprocess.PIPE,
+                stderr=subprocess.DEVNULL,
+                stdin=subprocess.DEVNULL,
                 text=True,
                 timeout=5
             )
@@ -92,9 +101,9 @@ def test_hsi_binary(hsi_bin_path: str) -> Dict[str, Any]:
                 "exists": True,
                 "is_file": True,
                 "is_executable": True,
-                "permissions": oct(os.stat(hsi_bin_path).st_mode)[-3:],
+                "permissions": oct(st.st_mode)[-3:],
                 "version_info": version_info,
-                "file_size": os.path.getsize(hsi_bin_path)
+                "file_size": st.st_size
             }
             
         except subprocess.TimeoutExpired:
@@ -105,7 +114,7 @@ def test_hsi_binary(hsi_bin_path: str) -> Dict[str, Any]:
                 "exists": True,
                 "is_file": True,
                 "is_executable": True,
-                "permissions": oct(os.stat(hsi_bin_path).st_mode)[-3:],
+                "permissions": oct(st.st_mode)[-3:],
                 "note": "Binary exists and is executable, but help command timed out"
             }
         except Exception as e:
@@ -117,7 +126,7 @@ def test_hsi_binary(hsi_bin_path: str) -> Dict[str, Any]:
                 "exists": True,
                 "is_file": True,
                 "is_executable": True,
-                "permissions": oct(os.stat(hsi_bin_path).st_mode)[-3:],
+                "permissions": oct(st.st_mode)[-3:],
                 "note": f"Binary is valid (execution test: {str(e)})"
             }
         
@@ -4,11 +4,36 @@ import logging
 import time
 from fastapi import FastAPI, Request
 
+class CachedTimeFormatter(logging.Formatter):
+    """
+    Formatter that formats the timestamp once per second instead of calling
+    strftime for every record (datefmt has 1-second resolution anyway).
+    Records logged outside a request get "-" for the URL field.
+    """
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self._last_second = None
+        self._last_time_str = ""
+
+    def formatTime(self, record, datefmt=None):
+        second = int(record.created)
+        if second != self._last_second:
+            self._last_time_str = super().formatTime(record, datefmt)
+            self._last_second = second
+        return self._last_time_str
+
+    def format(self, record):
+        if not hasattr(record, "url"):
+            record.url = "-"
+        return super().format(record)
+
+
 # 1. Configure the logger
 logger = logging.getLogger("api_logger")
 logger.setLevel(logging.INFO)
 handler = logging.FileHandler("api.log")
-handler.setFormatter(logging.Formatter(
+handler.setFormatter(CachedTimeFormatter(
     '%(asctime)s - %(levelname)s - %(message)s - URL: %(url)s',
     datefmt='%Y-%m-%d %H:%M:%S'
 ))
@@ -13,6 +13,13 @@ ops_sessions = {}
 # Session timeout in minutes
 SESSION_TIMEOUT_MINUTES = 30
 
+# Single-use tickets that let an EventSource open the storage stream without
+# putting the session token in the URL (EventSource cannot set headers)
+stream_tickets = {}
+
+# Stream ticket lifetime in seconds
+STREAM_TICKET_TIMEOUT_SECONDS = 30
+
 
 def get_ops_secret() -> str:
     """
@@ -72,3 +79,29 @@ def cleanup_expired_sessions() -> None:
     ]
     for token in expired_tokens:
         del ops_sessions[token]
+
+
+def create_stream_ticket(session_token: str) -> str:
+    """Create a short-lived, single-use ticket bound to an operations session."""
+    ticket = secrets.token_urlsafe(32)
+    stream_tickets[ticket] = {
+        "session_token": session_token,
+        "expires_at": datetime.now() + timedelta(seconds=STREAM_TICKET_TIMEOUT_SECONDS)
+    }
+    return ticket
+
+
+def redeem_stream_ticket(ticket: str) -> Optional[str]:
+    """
+    Consume a stream ticket and return its session token.
+    Returns None if the ticket is unknown, already used or expired.
+    """
+    now = datetime.now()
+    # Drop tickets that were never redeemed
+    for expired in [t for t, info in stream_tickets.items() if info["expires_at"] < now]:
+        del stream_tickets[expired]
+    
+    info = stream_tickets.pop(ticket, None)
+    if info is None:
+        return None
+    return info["session_token"]
@@ -1,5 +1,8 @@
+import hmac
 import ipaddress
-from typing import Optional, Dict
+import logging
+from functools import lru_cache
+from typing import Optional, Dict, Union
 from fastapi import Request, HTTPException, status
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
 from starlette.middleware.base import BaseHTTPMiddleware
@@ -8,20 +11,54 @@ from app.core.config import settings
 from app.core.logger import logger
 
 
+@lru_cache(maxsize=4096)
+def parse_ip_address(ip: str) -> Optional[Union[ipaddress.IPv4Address, ipaddress.IPv6Address]]:
+    """Parse an IP address string, memoized since clients repeat; None if invalid."""
+    try:
+        return ipaddress.ip_address(ip)
+    except ValueError:
+        return None
+
+
+BEARER_PREFIX = "Bearer "
+
+# Body of the 401 response, encoded once at import
+UNAUTHORIZED_RESPONSE_BODY = b'{"detail": "Missing or invalid client secret"}'
+
+# Raw ASGI header map: lowercase header name bytes to value bytes
+RawHeaders = Dict[bytes, bytes]
+
+
+def get_raw_headers(request: Request) -> RawHeaders:
+    """
+    Build a lookup of the request's raw ASGI headers once per request.
+    Names are already lowercase; the first occurrence of a repeated header
+    wins, matching request.headers.get().
+    """
+    return dict(reversed(request.scope["headers"]))
+
+
+def get_header(headers: RawHeaders, name: bytes) -> Optional[str]:
+    """Return a decoded header value from a raw header map, or None."""
+    value = headers.get(name)
+    return value.decode("latin-1") if value is not None else None
+
+
 class ClientSecretMiddleware(BaseHTTPMiddleware):
     """
     Middleware to validate client secret for all API calls except those from localhost.
     Supports site-specific client secrets based on request headers.
+    Secrets are fixed at construction; changing them requires a restart.
     """
     
     # Paths that don't require authentication
-    EXEMPT_PATHS = {
+    EXEMPT_PATHS = frozenset({
         "/",
         "/docs",
         "/redoc",
         "/openapi.json",
         "/favicon.ico",
-    }
+    })
     
     # Path prefixes that don't require authentication
     EXEMPT_PREFIXES = (
@@ -32,27 +69,33 @@ class ClientSecretMiddleware(BaseHTTPMiddleware):
     
     def __init__(self, app, default_client_secret: str, site_secrets: Dict[str, str]):
         super().__init__(app)
-        self.default_client_secret = default_client_secret
-        self.site_secrets = site_secrets
-        self.localhost_ips = {
-            ipaddress.ip_address("127.0.0.1"),
-            ipaddress.ip_address("::1"),
+        # Secrets pre-encoded once for constant-time comparison; site keys are
+        # lowercased to match get_site_from_request()
+        self._default_secret_bytes = default_client_secret.encode("utf-8")
+        self._site_secret_bytes = {
+            site.lower(): secret.encode("utf-8") for site, secret in site_secrets.items()
         }
-        # Docker gateway IPs (typical ranges)
+        # String forms let the common loopback case skip address parsing
+        self.localhost_ips = frozenset({"127.0.0.1", "::1", "::ffff:127.0.0.1"})
+        # Loopback and Docker gateway IPs (typical ranges)
         self.docker_networks = [
+            ipaddress.ip_network("127.0.0.0/8"),  # IPv4 loopback range
             ipaddress.ip_network("172.16.0.0/12"),  # Docker default bridge
             ipaddress.ip_network("192.168.0.0/16"),  # Docker custom networks
         ]
     
-    def get_site_from_request(self, request: Request) -> Optional[str]:
+    def get_site_from_request(self, request: Request, headers: Optional[RawHeaders] = None) -> Optional[str]:
         """Extract site identifier from request headers."""
+        if headers is None:
+            headers = get_raw_headers(request)
+        
         # Check for X-Site header
-        site_header = request.headers.get("X-Site")
+        site_header = get_header(headers, b"x-site")
         if site_header:
             return site_header.lower()
         
         # Check for X-Site-ID header (alternative)
-        site_id_header = request.headers.get("X-Site-ID")
+        site_id_header = get_header(headers, b"x-site-id")
         if site_id_header:
             return site_id_header.lower()
         
@@ -63,46 +106,49 @@ class ClientSecretMiddleware(BaseHTTPMiddleware):
         
         return None
     
-    def get_expected_client_secret(self, site: Optional[str]) -> str:
-        """Get the expected client secret for a given site."""
-        if site and site in self.site_secrets:
-            return self.site_secrets[site]
-        return self.default_client_secret
+    def get_expected_client_secret(self, site: Optional[str]) -> bytes:
+        """Get the expected client secret for a given site, as UTF-8 bytes."""
+        return self._site_secret_bytes.get(site, self._default_secret_bytes)
     
-    def is_localhost(self, ip: str, request: Request = None) -> bool:
+    def is_localhost(self, ip: str, request: Request = None, headers: Optional[RawHeaders] = None) -> bool:
         """Check if the request comes from localhost or Docker internal network."""
-        try:
-            client_ip = ipaddress.ip_address(ip)
-            
-            # Check if it's a standard localhost IP
-            if client_ip in self.localhost_ips:
-                return True
-            
-            # Check if it's from Docker internal network
-            for network in self.docker_networks:
-                if client_ip in network:
-                    return True
-            
-            # Check if Host header indicates localhost
-            if request:
-                host_header = request.headers.get("host", "")
-                if host_header.startswith("localhost") or host_header.startswith("127.0.0.1"):
-                    return True
-            
-            return False
-        except ValueError:
+        # Check if it's a standard localhost IP
+        if ip in self.localhost_ips:
+            return True
+        
+        client_ip = parse_ip_address(ip)
+        if client_ip is None:
             return False
+        
+        # Check if it's from Docker internal network
+        for network in self.docker_networks:
+            if client_ip in network:
+                return True
+        
+        # Check if Host header indicates localhost
+        if headers is None and request:
+            headers = get_raw_headers(request)
+        if headers:
+            host_header = get_header(headers, b"host") or ""
+            if host_header.startswith("localhost") or host_header.startswith("127.0.0.1"):
+                return True
+        
+        return False
     
-    def get_client_ip(self, request: Request) -> str:
+    def get_client_ip(self, request: Request, headers: Optional[RawHeaders] = None) -> str:
         """Extract client IP from request, considering proxy headers."""
+        if headers is None:
+            headers = get_raw_headers(request)
+        
         # Check for X-Forwarded-For header (common with reverse proxies)
-        forwarded_for = request.headers.get("X-Forwarded-For")
+        forwarded_for = get_header(headers, b"x-forwarded-for")
         if forwarded_for:
             # X-Forwarded-For can contain multiple IPs, take the first one
-            return forwarded_for.split(",")[0].strip()
+            first_ip, _, _ = forwarded_for.partition(",")
+            return first_ip.strip()
         
         # Check for X-Real-IP header (common with nginx)
-        real_ip = request.headers.get("X-Real-IP")
+        real_ip = get_header(headers, b"x-real-ip")
         if real_ip:
             return real_ip.strip()
         
@@ -112,65 +158,93 @@ class ClientSecretMiddleware(BaseHTTPMiddleware):
         
         return "unknown"
     
-    def validate_client_secret(self, request: Request) -> bool:
-        """Validate client secret from headers, using site-specific secret if available."""
-        site = self.get_site_from_request(request)
-        expected_secret = self.get_expected_client_secret(site)
-        
+    def secrets_match(self, provided: str, site: Optional[str]) -> bool:
+        """Compare a provided secret with the expected one in constant time."""
+        return hmac.compare_digest(
+            provided.encode("utf-8", "replace"),
+            self.get_expected_client_secret(site)
+        )
+    
+    def get_provided_client_secret(self, request: Request, headers: RawHeaders) -> Optional[str]:
+        """Extract the client secret the caller supplied, or None if there is none."""
         # Check Authorization header
-        auth_header = request.headers.get("Authorization")
-        if auth_header and auth_header.startswith("Bearer "):
-            token = auth_header.split(" ")[1]
-            return token == expected_secret
+        auth_header = get_header(headers, b"authorization")
+        if auth_header and auth_header.startswith(BEARER_PREFIX):
+            return auth_header[len(BEARER_PREFIX):]
         
         # Check X-Client-Secret header
-        client_secret_header = request.headers.get("X-Client-Secret")
+        client_secret_header = get_header(headers, b"x-client-secret")
         if client_secret_header:
-            return client_secret_header == expected_secret
+            return client_secret_header
         
         # Check query parameter
-        client_secret_param = request.query_params.get("client_secret")
-        if client_secret_param:
-            return client_secret_param == expected_secret
+        return request.query_params.get("client_secret") or None
+    
+    def validate_client_secret(
+        self,
+        request: Request,
+        headers: Optional[RawHeaders] = None,
+        site: Optional[str] = None
+    ) -> bool:
+        """Validate client secret from headers, using site-specific secret if available."""
+        if headers is None:
+            headers = get_raw_headers(request)
+            site = self.get_site_from_request(request, headers)
         
-        return False
+        provided = self.get_provided_client_secret(request, headers)
+        return provided is not None and self.secrets_match(provided, site)
     
     async def dispatch(self, request: Request, call_next):
+        # CORS preflights never carry credentials; let them through untouched
+        if request.method == "OPTIONS":
+            return await call_next(request)
+        
         # Check if path is exempt from authentication
         request_path = request.url.path
         if request_path in self.EXEMPT_PATHS or request_path.startswith(self.EXEMPT_PREFIXES):
             response = await call_next(request)
             return response
         
-        # Get client IP and site
-        client_ip = self.get_client_ip(request)
-        site = self.get_site_from_request(request)
+        # Get client IP and site from a single pass over the raw headers
+        headers = get_raw_headers(request)
+        client_ip = self.get_client_ip(request, headers)
+        # Shared with endpoints so they do not re-walk the proxy headers
+        request.state.client_ip = client_ip
+        # With no per-site secrets configured the site cannot change the
+        # expected secret, so the lookup is skipped entirely
+        site = self.get_site_from_request(request, headers) if self._site_secret_bytes else None
         
         # Skip validation for localhost
-        if self.is_localhost(client_ip, request):
-            site_info = f" for site '{site}'" if site else ""
-            logger.info(f"Localhost request from {client_ip}{site_info}, skipping client secret validation")
+        if self.is_localhost(client_ip, request, headers):
+            if logger.isEnabledFor(logging.INFO):
+                site_info = f" for site '{site}'" if site else ""
+                logger.info("Localhost request from %s%s, skipping client secret validation", client_ip, site_info)
             response = await call_next(request)
             return response
         
         # Validate client secret for non-localhost requests
-        if not self.validate_client_secret(request):
-            site_info = f" for site '{site}'" if site else ""
-            logger.warning(f"Unauthorized request from {client_ip}{site_info} - missing or invalid client secret")
+        if not self.validate_client_secret(request, headers, site):
+            if logger.isEnabledFor(logging.WARNING):
+                site_info = f" for site '{site}'" if site else ""
+                logger.warning("Unauthorized request from %s%s - missing or invalid client secret", client_ip, site_info)
             return Response(
-                content='{"detail": "Missing or invalid client secret"}',
+                content=UNAUTHORIZED_RESPONSE_BODY,
                 status_code=status.HTTP_401_UNAUTHORIZED,
                 media_type="application/json"
             )
         
-        site_info = f" for site '{site}'" if site else ""
-        logger.info(f"Authorized request from {client_ip}{site_info}")
+        if logger.isEnabledFor(logging.INFO):
+            site_info = f" for site '{site}'" if site else ""
+            logger.info("Authorized request from %s%s", client_ip, site_info)
         response = await call_next(request)
         return response
 
 
 def add_security_middleware(app):
-    """Add client secret security middleware to the FastAPI app."""
+    """
+    Add client secret security middleware to the FastAPI app.
+    The secrets are bound once here, so requests never read the settings models.
+    """
     app.add_middleware(
         ClientSecretMiddleware,
         default_client_secret=settings.webserver.client_secret,
@@ -109,9 +109,15 @@ class RevokeTokenResponse(BaseModel):
 
 def get_client_ip(request: Request) -> str:
     """Extract client IP from request."""
+    # Resolved once per request by ClientSecretMiddleware
+    client_ip = getattr(request.state, "client_ip", None)
+    if client_ip:
+        return client_ip
+    
     forwarded = request.headers.get("X-Forwarded-For")
     if forwarded:
-        return forwarded.split(",")[0].strip()
+        first_ip, _, _ = forwarded.partition(",")
+        return first_ip.strip()
     
     real_ip = request.headers.get("X-Real-IP")
     if real_ip:
@@ -1,19 +1,54 @@
+from contextlib import asynccontextmanager, suppress
+import asyncio
+import anyio
 from fastapi import FastAPI
+from fastapi.concurrency import run_in_threadpool
 from fastapi.staticfiles import StaticFiles
-from fastapi.responses import FileResponse
+from fastapi.responses import FileResponse, Response
 from app.core.config import settings
+from app.core.db_pool import add_database_error_handler, db_pool
 from app.core.logger import add_logging_middleware
 from app.core.security import add_security_middleware
 from app.admin_console import router as admin_router
 from app.ops_console import router as ops_router
-from app.worker import router as worker_router
+from app.worker import router as worker_router, expire_tokens_loop
 from app.hipaa_api import router as hipaa_router
+import json
 import os
 
-app = FastAPI()
+# Worker threads available to sync endpoints (AnyIO defaults to 40)
+THREADPOOL_SIZE = 64
+
+# Body of the constant root response, encoded once at import
+ROOT_RESPONSE_BODY = json.dumps({"Hello": "World"}, separators=(",", ":")).encode()
+
+# Settings are fixed after startup, so /config serves a body serialized once
+CONFIG_RESPONSE_BODY = json.dumps(
+    settings.model_dump(mode="json"), ensure_ascii=False, separators=(",", ":")
+).encode()
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Sync endpoints (e.g. the worker API) run in this threadpool
+    anyio.to_thread.current_default_thread_limiter().total_tokens = THREADPOOL_SIZE
+    # Open the minimum number of pooled database connections up front
+    await run_in_threadpool(db_pool.prewarm)
+    # Expire stale download tokens in the background
+    expire_task = asyncio.create_task(expire_tokens_loop())
+    yield
+    expire_task.cancel()
+    with suppress(asyncio.CancelledError):
+        await expire_task
+    # Close pooled database connections on shutdown
+    db_pool.close_all()
+
+
+app = FastAPI(lifespan=lifespan)
 
 add_logging_middleware(app)
 add_security_middleware(app)
+add_database_error_handler(app)
 
 # Mount static files directory
 app.mount("/static", StaticFiles(directory="app/static"), name="static")
@@ -33,8 +68,8 @@ async def favicon():
 
 @app.get("/")
 async def read_root():
-    return {"Hello": "World"}
+    return Response(content=ROOT_RESPONSE_BODY, media_type="application/json")
 
 @app.get("/config")
 async def read_config():
-    return settings.model_dump()
+    return Response(content=CONFIG_RESPONSE_BODY, media_type="application/json")
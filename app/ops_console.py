@@ -1,23 +1,43 @@
 """
 Operations console API endpoints for monitoring and managing system operations.
 """
-from fastapi import APIRouter, HTTPException, Header
-from fastapi.responses import HTMLResponse
-from typing import Optional
+from fastapi import APIRouter, HTTPException, Header, Query
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import FileResponse, HTMLResponse, Response, StreamingResponse
+from typing import Iterator, Optional, Dict, Any
 from pydantic import BaseModel
+import asyncio
+import json
 import os
+import time
 from pathlib import Path
 
 from app.core.ops_auth import (
     verify_ops_code,
     create_ops_session,
     verify_ops_session,
-    invalidate_ops_session
+    invalidate_ops_session,
+    create_stream_ticket,
+    redeem_stream_ticket
 )
 from app.core.config import settings
 
 router = APIRouter(prefix="/ops", tags=["operations"])
 
+# Storage usage is recomputed at most once per this many seconds
+STORAGE_INFO_TTL_SECONDS = 30
+
+# Console markup is served from disk instead of living in the module
+OPS_CONSOLE_HTML_PATH = Path(__file__).resolve().parent / "static" / "ops_console.html"
+
+_storage_info_cache: Dict[str, Any] = {"info": None, "json_bytes": b"", "computed_at": 0.0}
+
+# Shared refresher state for the storage-info event stream. The event is
+# replaced after every refresh so each subscriber wakes exactly once.
+_storage_updated = asyncio.Event()
+_storage_subscribers = 0
+_storage_refresher: Optional[asyncio.Task] = None
+
 
 # Request/Response Models
 class LoginRequest(BaseModel):
@@ -30,6 +50,10 @@ class LoginResponse(BaseModel):
     message: str
 
 
+class StreamTicketResponse(BaseModel):
+    ticket: str
+
+
 class StorageInfo(BaseModel):
     caches_size_gb: float
     jobs_size_gb: float
@@ -55,28 +79,146 @@ def verify_session(session_token: Optional[str]) -> None:
         raise HTTPException(status_code=401, detail="Invalid or expired session")
 
 
-def get_directory_size(directory: Path) -> float:
-    """Calculate total size of a directory in GB."""
+def iter_directory_files(directory: Path) -> Iterator[os.DirEntry]:
+    """Yield every regular file under directory (symlinks are not followed)."""
+    pending = [str(directory)]
+    while pending:
+        path = pending.pop()
+        try:
+            with os.scandir(path) as entries:
+                for entry in entries:
+                    if entry.is_dir(follow_symlinks=False):
+                        pending.append(entry.path)
+                    elif entry.is_file(follow_symlinks=False):
+                        yield entry
+        except OSError as e:
+            print(f"Warning: Cannot access directory {path}: {e}")
+
+
+def get_directory_size(directory: Path) -> int:
+    """Calculate total size of a directory in bytes."""
     if not directory.exists():
         print(f"Warning: Directory does not exist: {directory}")
-        return 0.0
+        return 0
     
     total_size = 0
     file_count = 0
     try:
-        for item in directory.rglob('*'):
-            if item.is_file():
-                try:
-                    total_size += item.stat().st_size
-                    file_count += 1
-                except (OSError, PermissionError) as e:
-                    print(f"Warning: Cannot access file {item}: {e}")
-        print(f"Calculated size for {directory}: {file_count} files, {total_size} bytes ({total_size / (1024 ** 3):.4f} GB)")
+        for entry in iter_directory_files(directory):
+            try:
+                total_size += entry.stat(follow_symlinks=False).st_size
+                file_count += 1
+            except OSError as e:
+                print(f"Warning: Cannot access file {entry.path}: {e}")
+        print(f"Calculated size for {directory}: {file_count} files, {total_size} bytes")
     except Exception as e:
         print(f"Error calculating size for {directory}: {e}")
     
-    # Convert bytes to GB
-    return total_size / (1024 ** 3)
+    return total_size
+
+
+def compute_storage_info() -> StorageInfo:
+    """Walk the storage folders and build a StorageInfo snapshot."""
+    # Get the project root directory
+    current_file = Path(__file__).resolve()
+    project_root = current_file.parent.parent
+    
+    # Get storage directories
+    storages_dir = project_root / "storages"
+    caches_dir = storages_dir / "caches"
+    jobs_dir = storages_dir / "jobs"
+    
+    # Debug logging
+    print(f"Storage info request - Project root: {project_root}")
+    print(f"  Storages dir: {storages_dir} (exists: {storages_dir.exists()})")
+    print(f"  Caches dir: {caches_dir} (exists: {caches_dir.exists()})")
+    print(f"  Jobs dir: {jobs_dir} (exists: {jobs_dir.exists()})")
+    
+    # Sizes are kept as whole MB; GB values are derived only for the response
+    caches_mb = get_directory_size(caches_dir) >> 20
+    jobs_mb = get_directory_size(jobs_dir) >> 20
+    total_mb = caches_mb + jobs_mb
+    
+    # Get threshold from settings
+    threshold_gb = settings.worker.staging_usage_threshold_in_gb
+    threshold_mb = threshold_gb * 1024
+    
+    # Determine status color (< 50% green, < 90% orange, otherwise red).
+    # Without a positive threshold usage is reported as 0%, hence green.
+    if threshold_mb <= 0 or total_mb * 2 < threshold_mb:
+        status = "green"
+    elif total_mb * 10 < threshold_mb * 9:
+        status = "orange"
+    else:
+        status = "red"
+    
+    usage_percentage = round(total_mb * 100 / threshold_mb, 2) if threshold_mb > 0 else 0
+    
+    return StorageInfo(
+        caches_size_gb=round(caches_mb / 1024, 2),
+        jobs_size_gb=round(jobs_mb / 1024, 2),
+        total_size_gb=round(total_mb / 1024, 2),
+        threshold_gb=float(threshold_gb),
+        usage_percentage=usage_percentage,
+        status=status
+    )
+
+
+def refresh_storage_info() -> bytes:
+    """Recompute the storage snapshot and store it as pre-encoded JSON bytes."""
+    info = compute_storage_info()
+    _storage_info_cache["info"] = info
+    _storage_info_cache["json_bytes"] = json.dumps(info.model_dump()).encode()
+    _storage_info_cache["computed_at"] = time.monotonic()
+    return _storage_info_cache["json_bytes"]
+
+
+def get_cached_storage_info() -> bytes:
+    """
+    Return the storage snapshot as pre-encoded JSON bytes.
+    The snapshot is recomputed and re-encoded at most once per TTL window.
+    """
+    if (_storage_info_cache["info"] is None
+            or time.monotonic() - _storage_info_cache["computed_at"] >= STORAGE_INFO_TTL_SECONDS):
+        return refresh_storage_info()
+    return _storage_info_cache["json_bytes"]
+
+
+async def _storage_refresh_loop() -> None:
+    """Refresh the storage snapshot once per TTL window while anyone is subscribed."""
+    global _storage_updated
+    
+    while _storage_subscribers > 0:
+        try:
+            await run_in_threadpool(refresh_storage_info)
+        except Exception as e:
+            print(f"Error refreshing storage info: {e}")
+        else:
+            updated, _storage_updated = _storage_updated, asyncio.Event()
+            updated.set()
+        await asyncio.sleep(STORAGE_INFO_TTL_SECONDS)
+
+
+async def _storage_event_stream(session_token: str):
+    """Yield server-sent events carrying the shared storage snapshot."""
+    global _storage_subscribers, _storage_refresher
+    
+    _storage_subscribers += 1
+    if _storage_refresher is None or _storage_refresher.done():
+        _storage_refresher = asyncio.create_task(_storage_refresh_loop())
+    
+    try:
+        if _storage_info_cache["json_bytes"]:
+            yield b"data: " + _storage_info_cache["json_bytes"] + b"\n\n"
+        
+        while True:
+            await _storage_updated.wait()
+            if not verify_ops_session(session_token):
+                yield b"event: logout\ndata: {}\n\n"
+                return
+            yield b"data: " + _storage_info_cache["json_bytes"] + b"\n\n"
+    finally:
+        _storage_subscribers -= 1
 
 
 @router.post("/login", response_model=LoginResponse)
@@ -108,60 +250,59 @@ async def ops_logout(session_token: Optional[str] = Header(None, alias="X-Sessio
 
 
 @router.get("/storage-info", response_model=StorageInfo)
-async def get_storage_info(session_token: Optional[str] = Header(None, alias="X-Session-Token")):
+async def get_storage_info(
+    refresh: bool = Query(False),
+    session_token: Optional[str] = Header(None, alias="X-Session-Token")
+):
     """
     Get storage usage information for caches and jobs folders.
+    Pass refresh=1 to recompute now instead of serving the cached snapshot.
     Requires valid operations session.
     """
     verify_session(session_token)
     
     try:
-        # Get the project root directory
-        current_file = Path(__file__).resolve()
-        project_root = current_file.parent.parent
-        
-        # Get storage directories
-        storages_dir = project_root / "storages"
-        caches_dir = storages_dir / "caches"
-        jobs_dir = storages_dir / "jobs"
-        
-        # Debug logging
-        print(f"Storage info request - Project root: {project_root}")
-        print(f"  Storages dir: {storages_dir} (exists: {storages_dir.exists()})")
-        print(f"  Caches dir: {caches_dir} (exists: {caches_dir.exists()})")
-        print(f"  Jobs dir: {jobs_dir} (exists: {jobs_dir.exists()})")
-        
-        # Calculate sizes
-        caches_size = get_directory_size(caches_dir)
-        jobs_size = get_directory_size(jobs_dir)
-        total_size = caches_size + jobs_size
-        
-        # Get threshold from settings
-        threshold_gb = float(settings.worker.staging_usage_threshold_in_gb)
-        
-        # Calculate usage percentage
-        usage_percentage = (total_size / threshold_gb * 100) if threshold_gb > 0 else 0
-        
-        # Determine status color
-        if usage_percentage < 50:
-            status = "green"
-        elif usage_percentage < 90:
-            status = "orange"
-        else:
-            status = "red"
-        
-        return StorageInfo(
-            caches_size_gb=round(caches_size, 2),
-            jobs_size_gb=round(jobs_size, 2),
-            total_size_gb=round(total_size, 2),
-            threshold_gb=threshold_gb,
-            usage_percentage=round(usage_percentage, 2),
-            status=status
+        # Walking the storage trees blocks, so keep it off the event loop
+        content = await run_in_threadpool(
+            refresh_storage_info if refresh else get_cached_storage_info
+        )
+        return Response(
+            content=content,
+            media_type="application/json",
+            headers={"Cache-Control": "no-store"}
         )
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Error retrieving storage info: {str(e)}")
 
 
+@router.post("/storage-info/stream-ticket", response_model=StreamTicketResponse)
+async def get_stream_ticket(session_token: Optional[str] = Header(None, alias="X-Session-Token")):
+    """
+    Issue a single-use ticket for opening the storage-info event stream.
+    Requires valid operations session.
+    """
+    verify_session(session_token)
+    return StreamTicketResponse(ticket=create_stream_ticket(session_token))
+
+
+@router.get("/storage-info/stream")
+async def stream_storage_info(ticket: Optional[str] = Query(None)):
+    """
+    Push storage usage updates as server-sent events.
+    All subscribers share one background refresh per TTL window.
+    EventSource cannot set headers, so the stream is opened with a short-lived,
+    single-use ticket instead of the session token, keeping the token out of URLs and logs.
+    """
+    session_token = redeem_stream_ticket(ticket) if ticket else None
+    verify_session(session_token)
+    
+    return StreamingResponse(
+        _storage_event_stream(session_token),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-store"}
+    )
+
+
 @router.post("/api/storage/clear-caches", response_model=StorageActionResponse)
 async def clear_caches(session_token: Optional[str] = Header(None, alias="X-Session-Token")):
     """
@@ -243,744 +384,4 @@ async def purge_expired_jobs(session_token: Optional[str] = Header(None, alias="
 @router.get("/", response_class=HTMLResponse)
 async def ops_console_page():
     """Serve the operations console HTML page."""
-    html_content = """
-<!DOCTYPE html>
-<html lang="en">
-<head>
-    <meta charset="UTF-8">
-    <meta name="viewport" content="width=device-width, initial-scale=1.0">
-    <title>Operations Console</title>
-    <style>
-        * {
-            margin: 0;
-            padding: 0;
-            box-sizing: border-box;
-        }
-        
-        body {
-            font-family: -apple-system, BlinkMacSystemFont, 'Segoe UI', Roboto, Oxygen, Ubuntu, Cantarell, sans-serif;
-            background: linear-gradient(135deg, #20c997 0%, #28a745 100%);
-            min-height: 100vh;
-            display: flex;
-            justify-content: center;
-            align-items: center;
-            padding: 20px;
-        }
-        
-        .container {
-            background: white;
-            border-radius: 12px;
-            box-shadow: 0 10px 40px rgba(0,0,0,0.2);
-            width: 100%;
-            max-width: 1200px;
-            max-height: 90vh;
-            display: flex;
-            flex-direction: column;
-        }
-        
-        .header {
-            background: linear-gradient(135deg, #20c997 0%, #28a745 100%);
-            color: white;
-            padding: 20px 30px;
-            border-radius: 12px 12px 0 0;
-            display: flex;
-            justify-content: space-between;
-            align-items: center;
-        }
-        
-        .header h1 {
-            font-size: 24px;
-            font-weight: 600;
-        }
-        
-        .logout-btn {
-            background: rgba(255,255,255,0.2);
-            border: 1px solid rgba(255,255,255,0.3);
-            color: white;
-            padding: 8px 20px;
-            border-radius: 6px;
-            cursor: pointer;
-            font-size: 14px;
-            transition: all 0.3s;
-        }
-        
-        .logout-btn:hover {
-            background: rgba(255,255,255,0.3);
-        }
-        
-        .login-container {
-            padding: 60px 40px;
-            text-align: center;
-        }
-        
-        .login-container h2 {
-            color: #333;
-            margin-bottom: 30px;
-            font-size: 28px;
-        }
-        
-        .login-form {
-            max-width: 400px;
-            margin: 0 auto;
-        }
-        
-        .form-group {
-            margin-bottom: 20px;
-            text-align: left;
-        }
-        
-        .form-group label {
-            display: block;
-            color: #555;
-            margin-bottom: 8px;
-            font-weight: 500;
-        }
-        
-        .form-group input {
-            width: 100%;
-            padding: 12px 16px;
-            border: 2px solid #e0e0e0;
-            border-radius: 6px;
-            font-size: 16px;
-            transition: border-color 0.3s;
-        }
-        
-        .form-group input:focus {
-            outline: none;
-            border-color: #20c997;
-        }
-        
-        .submit-btn {
-            width: 100%;
-            padding: 14px;
-            background: linear-gradient(135deg, #20c997 0%, #28a745 100%);
-            color: white;
-            border: none;
-            border-radius: 6px;
-            font-size: 16px;
-            font-weight: 600;
-            cursor: pointer;
-            transition: transform 0.2s;
-        }
-        
-        .submit-btn:hover {
-            transform: translateY(-2px);
-        }
-        
-        .error-message {
-            background: #fee;
-            color: #c33;
-            padding: 12px;
-            border-radius: 6px;
-            margin-top: 20px;
-            display: none;
-        }
-        
-        .tabs {
-            display: flex;
-            border-bottom: 2px solid #e0e0e0;
-            background: #f8f9fa;
-        }
-        
-        .tab {
-            padding: 15px 30px;
-            cursor: pointer;
-            border-bottom: 3px solid transparent;
-            transition: all 0.3s;
-            font-weight: 500;
-            color: #666;
-        }
-        
-        .tab:hover {
-            background: #e9ecef;
-        }
-        
-        .tab.active {
-            color: #20c997;
-            border-bottom-color: #20c997;
-            background: white;
-        }
-        
-        .content {
-            padding: 30px;
-            overflow-y: auto;
-            flex: 1;
-        }
-        
-        .tab-content {
-            display: none;
-        }
-        
-        .tab-content.active {
-            display: block;
-        }
-        
-        .storage-card {
-            background: #f8f9fa;
-            border-radius: 8px;
-            padding: 25px;
-            margin-bottom: 20px;
-        }
-        
-        .storage-header {
-            display: flex;
-            justify-content: space-between;
-            align-items: center;
-            margin-bottom: 20px;
-        }
-        
-        .storage-title {
-            font-size: 20px;
-            font-weight: 600;
-            color: #333;
-        }
-        
-        .refresh-btn {
-            background: #20c997;
-            color: white;
-            border: none;
-            padding: 8px 16px;
-            border-radius: 6px;
-            cursor: pointer;
-            font-size: 14px;
-            transition: background 0.3s;
-        }
-        
-        .refresh-btn:hover {
-            background: #28a745;
-        }
-        
-        .refresh-btn:disabled {
-            opacity: 0.5;
-            cursor: not-allowed;
-        }
-        
-        .action-buttons {
-            display: flex;
-            gap: 10px;
-            margin-top: 20px;
-            padding-top: 20px;
-            border-top: 2px solid #e0e0e0;
-        }
-        
-        .clear-caches-btn {
-            background: #dc3545;
-            color: white;
-            border: none;
-            padding: 10px 20px;
-            border-radius: 6px;
-            cursor: pointer;
-            font-size: 14px;
-            font-weight: 600;
-            transition: background 0.3s;
-            flex: 1;
-        }
-        
-        .clear-caches-btn:hover {
-            background: #c82333;
-        }
-        
-        .clear-caches-btn:disabled {
-            opacity: 0.5;
-            cursor: not-allowed;
-        }
-        
-        .purge-jobs-btn {
-            background: #fd7e14;
-            color: white;
-            border: none;
-            padding: 10px 20px;
-            border-radius: 6px;
-            cursor: pointer;
-            font-size: 14px;
-            font-weight: 600;
-            transition: background 0.3s;
-            flex: 1;
-        }
-        
-        .purge-jobs-btn:hover {
-            background: #e8590c;
-        }
-        
-        .purge-jobs-btn:disabled {
-            opacity: 0.5;
-            cursor: not-allowed;
-        }
-        
-        .storage-stats {
-            display: grid;
-            grid-template-columns: repeat(auto-fit, minmax(200px, 1fr));
-            gap: 15px;
-            margin-bottom: 25px;
-        }
-        
-        .stat-item {
-            background: white;
-            padding: 15px;
-            border-radius: 6px;
-            border-left: 4px solid #20c997;
-        }
-        
-        .stat-label {
-            font-size: 12px;
-            color: #666;
-            text-transform: uppercase;
-            margin-bottom: 5px;
-        }
-        
-        .stat-value {
-            font-size: 24px;
-            font-weight: 600;
-            color: #333;
-        }
-        
-        .stat-unit {
-            font-size: 14px;
-            color: #999;
-            margin-left: 4px;
-        }
-        
-        .progress-section {
-            margin-top: 25px;
-        }
-        
-        .progress-label {
-            display: flex;
-            justify-content: space-between;
-            margin-bottom: 10px;
-            font-weight: 500;
-            color: #555;
-        }
-        
-        .progress-bar-container {
-            width: 100%;
-            height: 40px;
-            background: #e0e0e0;
-            border-radius: 20px;
-            overflow: hidden;
-            position: relative;
-        }
-        
-        .progress-bar {
-            height: 100%;
-            transition: width 0.5s ease, background 0.3s ease;
-            display: flex;
-            align-items: center;
-            justify-content: center;
-            color: white;
-            font-weight: 600;
-            font-size: 14px;
-        }
-        
-        .progress-bar.green {
-            background: linear-gradient(90deg, #20c997 0%, #28a745 100%);
-        }
-        
-        .progress-bar.orange {
-            background: linear-gradient(90deg, #fd7e14 0%, #ffc107 100%);
-        }
-        
-        .progress-bar.red {
-            background: linear-gradient(90deg, #dc3545 0%, #e74c3c 100%);
-        }
-        
-        .status-legend {
-            display: flex;
-            gap: 20px;
-            margin-top: 15px;
-            font-size: 12px;
-            color: #666;
-        }
-        
-        .legend-item {
-            display: flex;
-            align-items: center;
-            gap: 6px;
-        }
-        
-        .legend-color {
-            width: 16px;
-            height: 16px;
-            border-radius: 3px;
-        }
-        
-        .legend-color.green {
-            background: #28a745;
-        }
-        
-        .legend-color.orange {
-            background: #fd7e14;
-        }
-        
-        .legend-color.red {
-            background: #dc3545;
-        }
-        
-        .hidden {
-            display: none;
-        }
-        
-        .loading {
-            text-align: center;
-            padding: 40px;
-            color: #999;
-        }
-        
-        .last-updated {
-            text-align: right;
-            font-size: 12px;
-            color: #999;
-            margin-top: 15px;
-        }
-    </style>
-</head>
-<body>
-    <div class="container">
-        <!-- Login View -->
-        <div id="loginView">
-            <div class="header">
-                <h1>🔧 Operations Console</h1>
-            </div>
-            <div class="login-container">
-                <h2>Operations Authentication</h2>
-                <form class="login-form" id="loginForm">
-                    <div class="form-group">
-                        <label for="secretCode">Secret Code</label>
-                        <input type="password" id="secretCode" name="secretCode" required 
-                               placeholder="Enter operations secret code">
-                    </div>
-                    <button type="submit" class="submit-btn">Login</button>
-                    <div class="error-message" id="loginError"></div>
-                </form>
-            </div>
-        </div>
-        
-        <!-- Operations Console View -->
-        <div id="consoleView" class="hidden">
-            <div class="header">
-                <h1>📊 Operations Dashboard</h1>
-                <button class="logout-btn" onclick="logout()">Logout</button>
-            </div>
-            
-            <div class="tabs">
-                <div class="tab active" onclick="switchTab('storage')">
-                    💾 Storage Management
-                </div>
-                <div class="tab" onclick="switchTab('token')">
-                    🔑 Token Management
-                </div>
-                <div class="tab" onclick="switchTab('blacklist')">
-                    🚫 Blacklist Management
-                </div>
-            </div>
-            
-            <div class="content">
-                <!-- Storage Management Tab -->
-                <div id="storageTab" class="tab-content active">
-                    <div class="storage-card">
-                        <div class="storage-header">
-                            <div class="storage-title">Storage Usage Monitor</div>
-                            <button class="refresh-btn" id="refreshBtn" onclick="loadStorageInfo()">
-                                🔄 Refresh
-                            </button>
-                        </div>
-                        
-                        <div id="storageContent" class="loading">
-                            Loading storage information...
-                        </div>
-                        
-                        <div class="action-buttons">
-                            <button class="clear-caches-btn" id="clearCachesBtn" onclick="clearCaches()">
-                                🗑️ Clear Caches
-                            </button>
-                            <button class="purge-jobs-btn" id="purgeJobsBtn" onclick="purgeExpiredJobs()">
-                                🧹 Purge Expired Jobs
-                            </button>
-                        </div>
-                    </div>
-                </div>
-                
-                <!-- Token Management Tab -->
-                <div id="tokenTab" class="tab-content">
-                    <!-- Content to be implemented -->
-                </div>
-                
-                <!-- Blacklist Management Tab -->
-                <div id="blacklistTab" class="tab-content">
-                    <!-- Content to be implemented -->
-                </div>
-            </div>
-        </div>
-    </div>
-
-    <script>
-        let sessionToken = null;
-        let lastUpdateTime = null;
-        
-        // Login form handler
-        document.getElementById('loginForm').addEventListener('submit', async (e) => {
-            e.preventDefault();
-            const secretCode = document.getElementById('secretCode').value;
-            const errorDiv = document.getElementById('loginError');
-            
-            try {
-                const response = await fetch('/ops/login', {
-                    method: 'POST',
-                    headers: {
-                        'Content-Type': 'application/json'
-                    },
-                    body: JSON.stringify({ secret_code: secretCode })
-                });
-                
-                const data = await response.json();
-                
-                if (data.success) {
-                    sessionToken = data.session_token;
-                    document.getElementById('loginView').classList.add('hidden');
-                    document.getElementById('consoleView').classList.remove('hidden');
-                    await loadStorageInfo();
-                } else {
-                    errorDiv.textContent = data.message;
-                    errorDiv.style.display = 'block';
-                }
-            } catch (error) {
-                errorDiv.textContent = 'Login failed: ' + error.message;
-                errorDiv.style.display = 'block';
-            }
-        });
-        
-        // Load storage information
-        async function loadStorageInfo() {
-            const refreshBtn = document.getElementById('refreshBtn');
-            const storageContent = document.getElementById('storageContent');
-            
-            refreshBtn.disabled = true;
-            refreshBtn.textContent = '🔄 Loading...';
-            
-            try {
-                const response = await fetch('/ops/storage-info', {
-                    headers: {
-                        'X-Session-Token': sessionToken
-                    }
-                });
-                
-                if (response.status === 401) {
-                    logout();
-                    return;
-                }
-                
-                const data = await response.json();
-                lastUpdateTime = new Date();
-                renderStorageInfo(data);
-            } catch (error) {
-                storageContent.innerHTML = 
-                    '<div class="error-message" style="display:block">Error loading storage info: ' + 
-                    error.message + '</div>';
-            } finally {
-                refreshBtn.disabled = false;
-                refreshBtn.textContent = '🔄 Refresh';
-            }
-        }
-        
-        // Render storage information
-        function renderStorageInfo(data) {
-            const storageContent = document.getElementById('storageContent');
-            
-            const html = `
-                <div class="storage-stats">
-                    <div class="stat-item">
-                        <div class="stat-label">Caches Folder</div>
-                        <div class="stat-value">
-                            ${data.caches_size_gb}
-                            <span class="stat-unit">GB</span>
-                        </div>
-                    </div>
-                    <div class="stat-item">
-                        <div class="stat-label">Jobs Folder</div>
-                        <div class="stat-value">
-                            ${data.jobs_size_gb}
-                            <span class="stat-unit">GB</span>
-                        </div>
-                    </div>
-                    <div class="stat-item">
-                        <div class="stat-label">Total Usage</div>
-                        <div class="stat-value">
-                            ${data.total_size_gb}
-                            <span class="stat-unit">GB</span>
-                        </div>
-                    </div>
-                    <div class="stat-item">
-                        <div class="stat-label">Threshold</div>
-                        <div class="stat-value">
-                            ${data.threshold_gb}
-                            <span class="stat-unit">GB</span>
-                        </div>
-                    </div>
-                </div>
-                
-                <div class="progress-section">
-                    <div class="progress-label">
-                        <span>Storage Usage</span>
-                        <span><strong>${data.usage_percentage}%</strong> of threshold</span>
-                    </div>
-                    <div class="progress-bar-container">
-                        <div class="progress-bar ${data.status}" style="width: ${Math.min(data.usage_percentage, 100)}%">
-                            ${data.usage_percentage}%
-                        </div>
-                    </div>
-                    
-                    <div class="status-legend">
-                        <div class="legend-item">
-                            <div class="legend-color green"></div>
-                            <span>Good (&lt; 50%)</span>
-                        </div>
-                        <div class="legend-item">
-                            <div class="legend-color orange"></div>
-                            <span>Warning (50-90%)</span>
-                        </div>
-                        <div class="legend-item">
-                            <div class="legend-color red"></div>
-                            <span>Critical (&gt; 90%)</span>
-                        </div>
-                    </div>
-                    
-                    <div class="last-updated">
-                        Last updated: ${lastUpdateTime.toLocaleString()}
-                    </div>
-                </div>
-            `;
-            
-            storageContent.innerHTML = html;
-        }
-        
-        // Switch between tabs
-        function switchTab(tabName) {
-            // Update tab buttons
-            const tabs = document.querySelectorAll('.tab');
-            tabs.forEach(tab => tab.classList.remove('active'));
-            event.target.classList.add('active');
-            
-            // Update tab content
-            const contents = document.querySelectorAll('.tab-content');
-            contents.forEach(content => content.classList.remove('active'));
-            document.getElementById(tabName + 'Tab').classList.add('active');
-        }
-        
-        // Logout
-        async function logout() {
-            if (sessionToken) {
-                try {
-                    await fetch('/ops/logout', {
-                        method: 'POST',
-                        headers: {
-                            'X-Session-Token': sessionToken
-                        }
-                    });
-                } catch (error) {
-                    console.error('Logout error:', error);
-                }
-            }
-            
-            sessionToken = null;
-            lastUpdateTime = null;
-            document.getElementById('loginView').classList.remove('hidden');
-            document.getElementById('consoleView').classList.add('hidden');
-            document.getElementById('secretCode').value = '';
-            document.getElementById('loginError').style.display = 'none';
-        }
-        
-        // Clear caches
-        async function clearCaches() {
-            if (!confirm('⚠️ Are you sure you want to clear all caches? This action cannot be undone.')) {
-                return;
-            }
-            
-            const clearCachesBtn = document.getElementById('clearCachesBtn');
-            const originalText = clearCachesBtn.textContent;
-            clearCachesBtn.disabled = true;
-            clearCachesBtn.textContent = '⏳ Clearing...';
-            
-            try {
-                const response = await fetch('/ops/api/storage/clear-caches', {
-                    method: 'POST',
-                    headers: {
-                        'X-Session-Token': sessionToken
-                    }
-                });
-                
-                if (response.status === 401) {
-                    logout();
-                    return;
-                }
-                
-                const data = await response.json();
-                
-                if (data.success) {
-                    const freedMB = (data.freed_bytes / (1024 * 1024)).toFixed(2);
-                    alert(`✅ ${data.message}\n\nDeleted: ${data.deleted_count} files\nFreed: ${freedMB} MB`);
-                    // Refresh storage info
-                    await loadStorageInfo();
-                } else {
-                    alert(`❌ Failed to clear caches: ${data.message}`);
-                }
-            } catch (error) {
-                alert(`❌ Error clearing caches: ${error.message}`);
-            } finally {
-                clearCachesBtn.disabled = false;
-                clearCachesBtn.textContent = originalText;
-            }
-        }
-        
-        // Purge expired jobs
-        async function purgeExpiredJobs() {
-            if (!confirm('⚠️ Are you sure you want to purge expired jobs? This action cannot be undone.')) {
-                return;
-            }
-            
-            const purgeJobsBtn = document.getElementById('purgeJobsBtn');
-            const originalText = purgeJobsBtn.textContent;
-            purgeJobsBtn.disabled = true;
-            purgeJobsBtn.textContent = '⏳ Purging...';
-            
-            try {
-                const response = await fetch('/ops/api/storage/purge-jobs', {
-                    method: 'POST',
-                    headers: {
-                        'X-Session-Token': sessionToken
-                    }
-                });
-                
-                if (response.status === 401) {
-                    logout();
-                    return;
-                }
-                
-                const data = await response.json();
-                
-                if (data.success) {
-                    const freedMB = (data.freed_bytes / (1024 * 1024)).toFixed(2);
-                    alert(`✅ ${data.message}\n\nDeleted: ${data.deleted_count} files\nFreed: ${freedMB} MB`);
-                    // Refresh storage info
-                    await loadStorageInfo();
-                } else {
-                    alert(`❌ Failed to purge jobs: ${data.message}`);
-                }
-            } catch (error) {
-                alert(`❌ Error purging jobs: ${error.message}`);
-            } finally {
-                purgeJobsBtn.disabled = false;
-                purgeJobsBtn.textContent = originalText;
-            }
-        }
-        
-        // Auto-refresh every 30 seconds when on storage tab
-        setInterval(() => {
-            if (sessionToken && document.getElementById('storageTab').classList.contains('active')) {
-                loadStorageInfo();
-            }
-        }, 30000);
-    </script>
-</body>
-</html>
-    """
-    return HTMLResponse(content=html_content)
+    return FileResponse(OPS_CONSOLE_HTML_PATH, media_type="text/html")
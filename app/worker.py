@@ -1,28 +1,66 @@
 """
 Worker API endpoints for job management.
 Handles job creation, status updates, and worker operations.
+
+Database endpoints are plain (sync) functions because pymysql blocks; FastAPI
+runs them in its threadpool so database calls never stall the event loop.
+Handlers borrow pooled connections inside their bodies (never through a
+dependency, whose setup would hold a threadpool thread while waiting for a
+free connection) and database errors are turned into 500 responses by the
+app-level handler in app.core.db_pool.
+Stale tokens are expired by a background task started from the app lifespan.
 """
-from fastapi import APIRouter, HTTPException, Request
-from pydantic import BaseModel, EmailStr
-from typing import Optional, Dict, Any
-import pymysql
+from fastapi import APIRouter, HTTPException, Query, Request, Response
+from fastapi.concurrency import run_in_threadpool
+from pydantic import AfterValidator, BaseModel, StringConstraints
+from typing import Annotated, Optional, Dict, Any
+import asyncio
 from datetime import datetime
 
-from app.core.config import settings
+from app.core.db_pool import db_pool
 from app.core.download_tokens import (
     TokenManager, 
     DownloadToken, 
+    JobStatus,
     TokenStatus,
-    SQL_QUERIES
+    SQL_QUERIES,
+    token_cache
 )
 from app.core.logger import logger
 
 router = APIRouter(prefix="/worker", tags=["worker"])
 
+# Syntax-only email check for worker traffic. pydantic compiles the pattern
+# once, unlike EmailStr which runs email-validator on every request.
+EMAIL_PATTERN = r"^[^@\s]+@[^@\s]+\.[^@\s]+$"
+
+
+def normalize_email_domain(email: str) -> str:
+    """Lowercase the domain part, as EmailStr did, so stored emails stay comparable."""
+    local_part, _, domain = email.rpartition("@")
+    return f"{local_part}@{domain.lower()}"
+
+
+# Surrounding whitespace is stripped before the pattern check, as EmailStr did
+WorkerEmail = Annotated[
+    str,
+    StringConstraints(strip_whitespace=True, pattern=EMAIL_PATTERN),
+    AfterValidator(normalize_email_domain)
+]
+
+# Rows fetched per round of cursor.fetchmany() when listing tokens
+FETCH_BATCH_SIZE = 256
+
+# How often the background task expires stale tokens
+EXPIRE_INTERVAL_SECONDS = 60
+
+# Set to wake the expiry task early; created when the task starts
+_expire_requested: Optional[asyncio.Event] = None
+
 
 class CreateJobRequest(BaseModel):
     """Request model for creating a new job"""
-    user_email: EmailStr
+    user_email: WorkerEmail
     file_name: str
 
 
@@ -34,28 +72,8 @@ class CreateJobResponse(BaseModel):
     details: Optional[Dict[str, Any]] = None
 
 
-def get_db_connection():
-    """Get a database connection using settings"""
-    try:
-        connection = pymysql.connect(
-            host=settings.database.host,
-            user=settings.database.user,
-            password=settings.database.password,
-            database=settings.database.db,
-            port=3306,
-            connect_timeout=10,
-            cursorclass=pymysql.cursors.DictCursor
-        )
-        return connection
-    except Exception as e:
-        raise HTTPException(
-            status_code=500,
-            detail=f"Database connection failed: {str(e)}"
-        )
-
-
 @router.post("/create_job", response_model=CreateJobResponse)
-async def create_job(request: CreateJobRequest):
+def create_job(request: CreateJobRequest):
     """
     Create a new job entry in the user_jobs table.
     
@@ -65,64 +83,36 @@ async def create_job(request: CreateJobRequest):
     Returns:
         CreateJobResponse with job creation details
     """
-    connection = None
-    try:
-        connection = get_db_connection()
+    with db_pool.connection() as connection, connection.cursor() as cursor:
+        # Insert new job with submitted status
+        created_time = datetime.now()
+        cursor.execute(SQL_QUERIES['create_job'], {
+            'user_email': request.user_email,
+            'file_name': request.file_name,
+            'job_status': JobStatus.SUBMITTED.value,
+            'created_time': created_time
+        })
         
-        with connection.cursor() as cursor:
-            # Insert new job with submitted status
-            sql = """
-                INSERT INTO user_jobs (user_email, file_name, job_status, created_time)
-                VALUES (%s, %s, %s, %s)
-            """
-            created_time = datetime.now()
-            cursor.execute(sql, (
-                request.user_email,
-                request.file_name,
-                'submitted',
-                created_time
-            ))
-            
-            # Get the inserted job_id
-            job_id = cursor.lastrowid
-            
-            connection.commit()
-            
-            return CreateJobResponse(
-                success=True,
-                message="Job created successfully",
-                job_id=job_id,
-                details={
-                    "user_email": request.user_email,
-                    "file_name": request.file_name,
-                    "job_status": "submitted",
-                    "created_time": created_time.isoformat()
-                }
-            )
-            
-    except pymysql.MySQLError as e:
-        if connection:
-            connection.rollback()
-        raise HTTPException(
-            status_code=500,
-            detail=f"Database error: {str(e)}"
-        )
-    except Exception as e:
-        if connection:
-            connection.rollback()
-        raise HTTPException(
-            status_code=500,
-            detail=f"Error creating job: {str(e)}"
-        )
-    finally:
-        if connection:
-            connection.close()
+        # Get the inserted job_id
+        job_id = cursor.lastrowid
+        
+        return {
+            "success": True,
+            "message": "Job created successfully",
+            "job_id": job_id,
+            "details": {
+                "user_email": request.user_email,
+                "file_name": request.file_name,
+                "job_status": JobStatus.SUBMITTED.value,
+                "created_time": created_time
+            }
+        }
 
 
 class GenerateTokenRequest(BaseModel):
     """Request model for generating a download token"""
     job_id: int
-    user_email: EmailStr
+    user_email: WorkerEmail
     max_downloads: int = 3
     expiry_hours: int = 24
 
@@ -131,7 +121,7 @@ class GenerateTokenResponse(BaseModel):
     """Response model for token generation"""
     success: bool
     token: Optional[str] = None
-    expires_at: Optional[str] = None
+    expires_at: Optional[datetime] = None
     max_downloads: int
     message: str
 
@@ -144,7 +134,7 @@ class ValidateTokenResponse(BaseModel):
 
 
 @router.post("/generate_token", response_model=GenerateTokenResponse)
-async def generate_download_token(request: GenerateTokenRequest):
+def generate_download_token(request: GenerateTokenRequest):
     """
     Generate a new download token for a completed job.
     Token expires after 24 hours or 3 downloads by default.
@@ -155,16 +145,24 @@ async def generate_download_token(request: GenerateTokenRequest):
     Returns:
         GenerateTokenResponse with token details
     """
-    connection = None
-    try:
-        connection = get_db_connection()
+    with db_pool.connection() as connection, connection.cursor() as cursor:
+        # Generate token data
+        token_data = TokenManager.create_token_data(
+            job_id=request.job_id,
+            user_email=request.user_email,
+            max_downloads=request.max_downloads,
+            expiry_hours=request.expiry_hours
+        )
         
-        with connection.cursor() as cursor:
-            # Verify job exists and belongs to user
-            cursor.execute(
-                "SELECT job_id, user_email, job_status FROM user_jobs WHERE job_id = %s",
-                (request.job_id,)
-            )
+        # Insert the token, verifying job ownership and status in the same statement
+        cursor.execute(
+            SQL_QUERIES['create_token_if_job_valid'],
+            {**token_data, 'user_email': request.user_email}
+        )
+        
+        if cursor.rowcount == 0:
+            # Nothing inserted; look the job up once to report why
+            cursor.execute(SQL_QUERIES['get_job_owner'], {'job_id': request.job_id})
             job = cursor.fetchone()
             
             if not job:
@@ -179,133 +177,101 @@ async def generate_download_token(request: GenerateTokenRequest):
                     detail="Job does not belong to this user"
                 )
             
-            if job['job_status'] != 'completed':
-                raise HTTPException(
-                    status_code=400,
-                    detail=f"Cannot generate token for job with status: {job['job_status']}"
-                )
-            
-            # Generate token data
-            token_data = TokenManager.create_token_data(
-                job_id=request.job_id,
-                user_email=request.user_email,
-                max_downloads=request.max_downloads,
-                expiry_hours=request.expiry_hours
-            )
-            
-            # Insert token into database
-            cursor.execute(SQL_QUERIES['create_token'], token_data)
-            connection.commit()
-            
-            logger.info(
-                f"Generated download token for job {request.job_id}, "
-                f"expires at {token_data['expires_at']}"
-            )
-            
-            return GenerateTokenResponse(
-                success=True,
-                token=token_data['token'],
-                expires_at=token_data['expires_at'].isoformat(),
-                max_downloads=token_data['max_downloads'],
-                message="Download token generated successfully"
+            raise HTTPException(
+                status_code=400,
+                detail=f"Cannot generate token for job with status: {job['job_status']}"
             )
-            
-    except HTTPException:
-        raise
-    except pymysql.MySQLError as e:
-        if connection:
-            connection.rollback()
-        raise HTTPException(
-            status_code=500,
-            detail=f"Database error: {str(e)}"
-        )
-    except Exception as e:
-        if connection:
-            connection.rollback()
-        raise HTTPException(
-            status_code=500,
-            detail=f"Error generating token: {str(e)}"
+        
+        logger.info(
+            "Generated download token for job %s, expires at %s",
+            request.job_id, token_data['expires_at']
         )
-    finally:
-        if connection:
-            connection.close()
+        
+        return {
+            "success": True,
+            "token": token_data['token'],
+            "expires_at": token_data['expires_at'],
+            "max_downloads": token_data['max_downloads'],
+            "message": "Download token generated successfully"
+        }
 
 
 @router.get("/validate_token/{token}", response_model=ValidateTokenResponse)
-async def validate_download_token(token: str, request: Request):
+def validate_download_token(token: str, request: Request, response: Response):
     """
     Validate a download token and return its details.
-    Checks expiration time and download count.
+    Checks expiration time and download count. Responses carry an ETag, and
+    a matching If-None-Match gets 304 Not Modified.
     
     Args:
         token: Download token string
         request: FastAPI request object for client IP
+        response: FastAPI response object for the ETag header
     
     Returns:
         ValidateTokenResponse with validation result
     """
-    connection = None
-    try:
-        connection = get_db_connection()
-        
-        with connection.cursor() as cursor:
-            # Get token from database
+    # Serve hot tokens from the cache; only borrow a connection on a miss
+    token_row = token_cache.get(token)
+    if token_row is None:
+        with db_pool.connection() as connection, connection.cursor() as cursor:
             cursor.execute(SQL_QUERIES['get_token'], {'token': token})
             token_row = cursor.fetchone()
-            
-            if not token_row:
-                return ValidateTokenResponse(
-                    valid=False,
-                    error_message="Token not found"
-                )
-            
-            # Create DownloadToken object
-            download_token = DownloadToken(**token_row)
-            
-            # Validate token
-            is_valid, error_msg = TokenManager.validate_token_params(
-                download_token,
-                client_ip=request.client.host if request.client else None
-            )
-            
-            if not is_valid:
-                # Mark token as expired if it should be
-                if download_token.should_expire():
-                    cursor.execute(
-                        SQL_QUERIES['mark_expired'],
-                        {'token_id': download_token.token_id}
-                    )
-                    connection.commit()
-                    logger.info(f"Marked token {token} as expired")
-                
-                return ValidateTokenResponse(
-                    valid=False,
-                    token_info=download_token.to_dict(),
-                    error_message=error_msg
-                )
-            
-            return ValidateTokenResponse(
-                valid=True,
-                token_info=download_token.to_dict()
+        
+        if not token_row:
+            return {
+                "valid": False,
+                "error_message": "Token not found"
+            }
+        
+        token_cache.set(token, token_row)
+    
+    # Create DownloadToken object
+    download_token = DownloadToken(**token_row)
+    
+    # Validate token
+    is_valid, error_msg = TokenManager.validate_token_params(
+        download_token,
+        client_ip=request.client.host if request.client else None
+    )
+    
+    # Mark token as expired if it should be
+    if not is_valid and download_token.should_expire() and download_token.status != TokenStatus.EXPIRED:
+        with db_pool.connection() as connection, connection.cursor() as cursor:
+            cursor.execute(
+                SQL_QUERIES['mark_expired'],
+                {'token_id': download_token.token_id}
             )
-            
-    except pymysql.MySQLError as e:
-        raise HTTPException(
-            status_code=500,
-            detail=f"Database error: {str(e)}"
-        )
-    except Exception as e:
-        raise HTTPException(
-            status_code=500,
-            detail=f"Error validating token: {str(e)}"
-        )
-    finally:
-        if connection:
-            connection.close()
+        token_cache.invalidate(token)
+        logger.info("Marked token %s as expired", token)
+    
+    # The response only changes with these fields, so repeat polls of an
+    # unchanged token get an empty 304 instead of a re-serialized body
+    etag = (
+        f'W/"{download_token.token_id}-{download_token.download_count}-'
+        f'{download_token.status.value}-{int(is_valid)}"'
+    )
+    if_none_match = request.headers.get("if-none-match", "")
+    if etag in (tag.strip() for tag in if_none_match.split(",")):
+        return Response(status_code=304, headers={"ETag": etag, "Cache-Control": "no-cache"})
+    response.headers["ETag"] = etag
+    response.headers["Cache-Control"] = "no-cache"
+    
+    if not is_valid:
+        return {
+            "valid": False,
+            "token_info": download_token.to_dict(),
+            "error_message": error_msg
+        }
+    
+    return {
+        "valid": True,
+        "token_info": download_token.to_dict()
+    }
 
 
 @router.post("/record_download/{token}")
-async def record_download(token: str, request: Request):
+def record_download(token: str, request: Request):
     """
     Record a download event for a token.
     Increments download count and updates last download time/IP.
@@ -317,140 +283,128 @@ async def record_download(token: str, request: Request):
     Returns:
         Download confirmation with updated token info
     """
-    connection = None
-    try:
-        connection = get_db_connection()
+    with db_pool.connection() as connection, connection.cursor() as cursor:
+        # Record the download in a single conditional UPDATE; it only
+        # matches while the token is active, unexpired and under its limit
+        client_ip = request.client.host if request.client else None
+        update_data = TokenManager.prepare_download_update(
+            token=token,
+            client_ip=client_ip
+        )
+        cursor.execute(SQL_QUERIES['record_download'], update_data)
+        recorded = cursor.rowcount == 1
         
-        with connection.cursor() as cursor:
-            # Get and validate token
-            cursor.execute(SQL_QUERIES['get_token'], {'token': token})
-            token_row = cursor.fetchone()
-            
-            if not token_row:
-                raise HTTPException(
-                    status_code=404,
-                    detail="Token not found"
-                )
-            
-            download_token = DownloadToken(**token_row)
-            
-            # Validate token before recording download
-            is_valid, error_msg = TokenManager.validate_token_params(
-                download_token,
-                client_ip=request.client.host if request.client else None
+        # Read back the token for the response (or to explain a rejection)
+        cursor.execute(SQL_QUERIES['get_token'], {'token': token})
+        token_row = cursor.fetchone()
+        
+        # Whether or not this download was recorded, the cached row may be
+        # stale (another process may have exhausted or expired the token)
+        token_cache.invalidate(token)
+        
+        if not token_row:
+            raise HTTPException(
+                status_code=404,
+                detail="Token not found"
             )
-            
-            if not is_valid:
-                raise HTTPException(
-                    status_code=403,
-                    detail=error_msg or "Token is invalid"
-                )
-            
-            # Record download
-            client_ip = request.client.host if request.client else None
-            update_data = TokenManager.prepare_download_update(
-                token_id=download_token.token_id,
+        
+        download_token = DownloadToken(**token_row)
+        
+        if not recorded:
+            _, error_msg = TokenManager.validate_token_params(
+                download_token,
                 client_ip=client_ip
             )
-            
-            cursor.execute(SQL_QUERIES['update_download'], update_data)
-            
-            # Check if token should be expired after this download
-            new_count = download_token.download_count + 1
-            if new_count >= download_token.max_downloads:
-                cursor.execute(
-                    SQL_QUERIES['mark_expired'],
-                    {'token_id': download_token.token_id}
-                )
-                logger.info(
-                    f"Token {token} marked as expired after {new_count} downloads"
-                )
-            
-            connection.commit()
-            
+            raise HTTPException(
+                status_code=403,
+                detail=error_msg or "Token is invalid"
+            )
+        
+        new_count = download_token.download_count
+        if download_token.status == TokenStatus.EXPIRED:
             logger.info(
-                f"Recorded download for token {token} "
-                f"(count: {new_count}/{download_token.max_downloads}) "
-                f"from IP: {client_ip}"
+                "Token %s marked as expired after %d downloads", token, new_count
             )
-            
-            return {
-                "success": True,
-                "message": "Download recorded successfully",
-                "download_count": new_count,
-                "max_downloads": download_token.max_downloads,
-                "remaining_downloads": max(0, download_token.max_downloads - new_count),
-                "job_id": download_token.job_id
-            }
-            
-    except HTTPException:
-        raise
-    except pymysql.MySQLError as e:
-        if connection:
-            connection.rollback()
-        raise HTTPException(
-            status_code=500,
-            detail=f"Database error: {str(e)}"
-        )
-    except Exception as e:
-        if connection:
-            connection.rollback()
-        raise HTTPException(
-            status_code=500,
-            detail=f"Error recording download: {str(e)}"
+        
+        logger.info(
+            "Recorded download for token %s (count: %d/%d) from IP: %s",
+            token, new_count, download_token.max_downloads, client_ip
         )
+        
+        return {
+            "success": True,
+            "message": "Download recorded successfully",
+            "download_count": new_count,
+            "max_downloads": download_token.max_downloads,
+            "remaining_downloads": max(0, download_token.max_downloads - new_count),
+            "job_id": download_token.job_id
+        }
+
+
+def _expire_tokens_once() -> int:
+    """Run the batch expiry UPDATE on a pooled connection and return its rowcount."""
+    with db_pool.connection() as connection, connection.cursor() as cursor:
+        cursor.execute(SQL_QUERIES['expire_old_tokens'])
+        return cursor.rowcount
+
+
+async def expire_tokens_loop() -> None:
+    """
+    Expire stale tokens every EXPIRE_INTERVAL_SECONDS, or sooner when woken
+    by /worker/expire_old_tokens. Triggers that arrive while a run is in
+    progress are coalesced into the next run. Started from the app lifespan.
+    """
+    global _expire_requested
+    
+    _expire_requested = asyncio.Event()
+    try:
+        while True:
+            try:
+                await asyncio.wait_for(_expire_requested.wait(), timeout=EXPIRE_INTERVAL_SECONDS)
+            except asyncio.TimeoutError:
+                pass
+            _expire_requested.clear()
+            
+            try:
+                expired_count = await run_in_threadpool(_expire_tokens_once)
+            except Exception as e:
+                logger.error("Error expiring tokens: %s", e)
+                continue
+            
+            if expired_count:
+                logger.info("Marked %d tokens as expired", expired_count)
     finally:
-        if connection:
-            connection.close()
+        _expire_requested = None
 
 
 @router.post("/expire_old_tokens")
 async def expire_old_tokens():
     """
-    Batch update to mark expired tokens.
+    Trigger an immediate run of the background token expiry.
     Marks tokens as expired if they've passed 24 hours or reached max downloads.
     
     Returns:
-        Count of expired tokens
+        Confirmation that the expiry run was queued
     """
-    connection = None
-    try:
-        connection = get_db_connection()
-        
-        with connection.cursor() as cursor:
-            cursor.execute(SQL_QUERIES['expire_old_tokens'])
-            expired_count = cursor.rowcount
-            connection.commit()
-            
-            logger.info(f"Marked {expired_count} tokens as expired")
-            
-            return {
-                "success": True,
-                "expired_count": expired_count,
-                "message": f"Marked {expired_count} tokens as expired"
-            }
-            
-    except pymysql.MySQLError as e:
-        if connection:
-            connection.rollback()
-        raise HTTPException(
-            status_code=500,
-            detail=f"Database error: {str(e)}"
-        )
-    except Exception as e:
-        if connection:
-            connection.rollback()
+    if _expire_requested is None:
         raise HTTPException(
-            status_code=500,
-            detail=f"Error expiring tokens: {str(e)}"
+            status_code=503,
+            detail="Token expiry task is not running"
         )
-    finally:
-        if connection:
-            connection.close()
+    
+    _expire_requested.set()
+    return {
+        "success": True,
+        "queued": True,
+        "message": "Token expiry queued"
+    }
 
 
 @router.get("/job/{job_id}/tokens")
-async def get_job_tokens(job_id: int, user_email: EmailStr):
+def get_job_tokens(
+    job_id: int,
+    user_email: Annotated[WorkerEmail, Query()]
+):
     """
     Get all tokens associated with a job.
     
@@ -461,16 +415,27 @@ async def get_job_tokens(job_id: int, user_email: EmailStr):
     Returns:
         List of tokens for the job
     """
-    connection = None
-    try:
-        connection = get_db_connection()
-        
-        with connection.cursor() as cursor:
-            # Verify job belongs to user
-            cursor.execute(
-                "SELECT user_email FROM user_jobs WHERE job_id = %s",
-                (job_id,)
+    with db_pool.connection() as connection, connection.cursor() as cursor:
+        # Get all tokens for the job (only if it belongs to the user),
+        # serializing them batch by batch
+        cursor.arraysize = FETCH_BATCH_SIZE
+        cursor.execute(
+            SQL_QUERIES['get_job_tokens_with_auth'],
+            {'job_id': job_id, 'user_email': user_email}
+        )
+        token_list = []
+        while True:
+            rows = cursor.fetchmany()
+            if not rows:
+                break
+            token_list.extend(
+                DownloadToken.to_api_dict(token_row)
+                for token_row in rows
             )
+        
+        if not token_list:
+            # No rows: the job is missing, not the user's, or has no tokens
+            cursor.execute(SQL_QUERIES['get_job_owner'], {'job_id': job_id})
             job = cursor.fetchone()
             
             if not job:
@@ -484,36 +449,10 @@ async def get_job_tokens(job_id: int, user_email: EmailStr):
                     status_code=403,
                     detail="Job does not belong to this user"
                 )
-            
-            # Get all tokens for the job
-            cursor.execute(SQL_QUERIES['get_job_tokens'], {'job_id': job_id})
-            tokens = cursor.fetchall()
-            
-            # Convert to DownloadToken objects and serialize
-            token_list = [
-                DownloadToken(**token_row).to_dict()
-                for token_row in tokens
-            ]
-            
-            return {
-                "success": True,
-                "job_id": job_id,
-                "token_count": len(token_list),
-                "tokens": token_list
-            }
-            
-    except HTTPException:
-        raise
-    except pymysql.MySQLError as e:
-        raise HTTPException(
-            status_code=500,
-            detail=f"Database error: {str(e)}"
-        )
-    except Exception as e:
-        raise HTTPException(
-            status_code=500,
-            detail=f"Error retrieving tokens: {str(e)}"
-        )
-    finally:
-        if connection:
-            connection.close()
+        
+        return {
+            "success": True,
+            "job_id": job_id,
+            "token_count": len(token_list),
+            "tokens": token_list
+        }
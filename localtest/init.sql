@@ -52,9 +52,9 @@ CREATE TABLE IF NOT EXISTS download_tokens (
     last_download_time TIMESTAMP NULL,
     last_download_ip VARCHAR(45) NULL,
     FOREIGN KEY (job_id) REFERENCES user_jobs(job_id) ON DELETE CASCADE,
-    INDEX idx_token (token),
-    INDEX idx_job_id (job_id),
-    INDEX idx_status (status),
+    -- token lookups use the UNIQUE index above
+    INDEX idx_job_created (job_id, created_time),
+    INDEX idx_status_expires (status, expires_at),
     INDEX idx_expires_at (expires_at)
 ) COMMENT='Table for managing download tokens with expiration and usage limits';
 
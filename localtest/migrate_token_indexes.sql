@@ -0,0 +1,23 @@
+-- Align download_tokens indexes with the hot queries in app/worker.py
+-- (SQL_QUERIES in app/core/download_tokens.py). Run once against databases
+-- created from an older init.sql:
+--   mysql -u dbtester -p my_app_db < migrate_token_indexes.sql
+
+USE my_app_db;
+
+-- get_job_tokens / get_job_tokens_with_auth: WHERE job_id = ? ORDER BY created_time DESC
+-- (added before idx_job_id is dropped so the job_id foreign key always has an index)
+ALTER TABLE download_tokens ADD INDEX idx_job_created (job_id, created_time);
+ALTER TABLE download_tokens DROP INDEX idx_job_id;
+
+-- expire_old_tokens: WHERE status = 'active' AND expires_at < NOW() ...
+ALTER TABLE download_tokens ADD INDEX idx_status_expires (status, expires_at);
+ALTER TABLE download_tokens DROP INDEX idx_status;
+
+-- get_token / record_download: WHERE token = ? already uses the UNIQUE index
+-- on token; idx_token was a second copy that every INSERT had to maintain
+ALTER TABLE download_tokens DROP INDEX idx_token;
+
+-- Verify, e.g.:
+--   EXPLAIN SELECT * FROM download_tokens WHERE token = 'abc';                       -- key: token (const)
+--   EXPLAIN SELECT * FROM download_tokens WHERE job_id = 1 ORDER BY created_time DESC; -- key: idx_job_created, no filesort
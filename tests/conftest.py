@@ -0,0 +1,109 @@
+from datetime import datetime, timedelta
+
+import pytest
+from fastapi.testclient import TestClient
+
+from app.main import app
+from app.core import db_pool as db_pool_module
+from app.core.download_tokens import token_cache
+
+
+@pytest.fixture(scope="session")
+def client():
+    """One TestClient for the whole session, so the app lifespan runs once."""
+    with TestClient(app) as test_client:
+        yield test_client
+
+
+class FakeCursor:
+    """Cursor stand-in that answers every execute() through the connection's handler."""
+
+    def __init__(self, connection):
+        self.connection = connection
+        self.rowcount = 0
+        self.lastrowid = None
+        self._rows = []
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        return False
+
+    def execute(self, sql, params=None):
+        self.connection.executed.append((sql, params))
+        self.rowcount, self._rows = self.connection.handler(sql, params)
+
+    def fetchone(self):
+        return self._rows[0] if self._rows else None
+
+    def fetchmany(self, size=1):
+        rows, self._rows = self._rows[:size], self._rows[size:]
+        return rows
+
+    def fetchall(self):
+        rows, self._rows = self._rows, []
+        return rows
+
+
+class FakeConnection:
+    """
+    pymysql connection stand-in.
+    handler(sql, params) returns (rowcount, rows) for each executed statement.
+    """
+
+    def __init__(self, handler=None):
+        self.handler = handler or (lambda sql, params: (0, []))
+        self.executed = []
+        self.open = True
+        self.server_status = 0
+        self.rollbacks = 0
+        self.pings = 0
+        self.closed = False
+
+    def cursor(self):
+        return FakeCursor(self)
+
+    def rollback(self):
+        self.rollbacks += 1
+
+    def ping(self, reconnect=False):
+        self.pings += 1
+
+    def close(self):
+        self.open = False
+        self.closed = True
+
+
+def token_row(**overrides):
+    """A download_tokens row for an active token with downloads remaining."""
+    row = {
+        "token_id": 1,
+        "token": "tok",
+        "job_id": 7,
+        "status": "active",
+        "download_count": 1,
+        "max_downloads": 3,
+        "created_time": datetime.now(),
+        "expires_at": datetime.now() + timedelta(hours=1),
+        "last_download_time": None,
+        "last_download_ip": None,
+    }
+    row.update(overrides)
+    return row
+
+
+@pytest.fixture
+def fake_db(monkeypatch):
+    """
+    Route the global pool to one FakeConnection; set its handler per test.
+    The token cache is cleared so rows never leak between tests.
+    """
+    connection = FakeConnection()
+    pool = db_pool_module.db_pool
+    monkeypatch.setattr(pool, "_connect", lambda: connection)
+    pool.close_all()
+    token_cache._entries.clear()
+    yield connection
+    pool.close_all()
+    token_cache._entries.clear()
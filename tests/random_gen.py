@@ -1,30 +1,49 @@
-import os
 import random
+from concurrent.futures import ProcessPoolExecutor
 
-def generate_random_files(filename_list_file):
-    # Constants for sizes in bytes
-    MIN_SIZE = 200 * 1024       # 200 KB
-    MAX_SIZE = 10 * 1024 * 1024  # 10 MB
+# Constants for sizes in bytes
+MIN_SIZE = 200 * 1024       # 200 KB
+MAX_SIZE = 10 * 1024 * 1024  # 10 MB
 
+# Files are written in chunks of this size so memory stays bounded
+CHUNK_SIZE = 64 * 1024  # 64 KB
+
+def _make_one(name, min_size, max_size, seed):
+    # Test data does not need a CSPRNG; a per-file seed keeps files
+    # reproducible no matter which worker process writes them
+    rng = random.Random(seed)
+
+    # Determine a random size for this specific file
+    file_size = rng.randint(min_size, max_size)
+
+    # Generate and write random bytes one chunk at a time
+    with open(name, 'wb', buffering=CHUNK_SIZE) as fout:
+        remaining = file_size
+        while remaining:
+            n = min(CHUNK_SIZE, remaining)
+            fout.write(rng.randbytes(n))
+            remaining -= n
+
+    print(f"Created {name} ({file_size / 1024:.2f} KB)")
+
+def generate_random_files(filename_list_file, seed=None):
     try:
         with open(filename_list_file, 'r') as f:
             # Strip whitespace and ignore empty lines
             filenames = [line.strip() for line in f if line.strip()]
-        
+
         if not filenames:
             print("The text file is empty. No files to create.")
             return
 
-        for name in filenames:
-            # Determine a random size for this specific file
-            file_size = random.randint(MIN_SIZE, MAX_SIZE)
-            
-            # Generate and write random bytes
-            with open(name, 'wb') as fout:
-                fout.write(os.urandom(file_size))
-            
-            print(f"Created {name} ({file_size / 1024:.2f} KB)")
-            
+        # Derive each file's seed from its name so output is deterministic
+        seeds = [None if seed is None else f"{seed}:{name}" for name in filenames]
+
+        # Files are independent, so generate them across all CPU cores
+        count = len(filenames)
+        with ProcessPoolExecutor() as executor:
+            list(executor.map(_make_one, filenames, [MIN_SIZE] * count, [MAX_SIZE] * count, seeds))
+
         print("\nAll files generated successfully!")
 
     except FileNotFoundError:
@@ -35,4 +54,4 @@ def generate_random_files(filename_list_file):
 # Run the script
 if __name__ == "__main__":
     # Change 'files.txt' to the name of your actual text file
-    generate_random_files('random_file.txt')
\ No newline at end of file
+    generate_random_files('random_file.txt')
@@ -0,0 +1,159 @@
+import time
+
+import pymysql
+import pytest
+from pymysql.constants import SERVER_STATUS
+
+from app.core.db_pool import PING_AFTER_IDLE_SECONDS, ConnectionPool
+from conftest import FakeConnection
+
+
+def make_pool(monkeypatch, connect, min_size=1, max_size=1):
+    """A pool whose _connect is replaced and which fails fast when exhausted."""
+    pool = ConnectionPool(min_size=min_size, max_size=max_size, acquire_timeout=0.01)
+    monkeypatch.setattr(pool, "_connect", connect)
+    return pool
+
+
+def refuse_connection():
+    raise pymysql.err.OperationalError(2003, "Can't connect to MySQL server")
+
+
+class BrokenPingConnection(FakeConnection):
+    def ping(self, reconnect=False):
+        raise pymysql.err.OperationalError(2006, "MySQL server has gone away")
+
+
+class BrokenRollbackConnection(FakeConnection):
+    def rollback(self):
+        raise pymysql.err.OperationalError(2013, "Lost connection to MySQL server")
+
+
+def test_connection_is_reused(monkeypatch):
+    """Test that a released connection is lent out again instead of reopened."""
+    opened = []
+
+    def connect():
+        opened.append(FakeConnection())
+        return opened[-1]
+
+    pool = make_pool(monkeypatch, connect)
+
+    with pool.connection() as first:
+        pass
+    with pool.connection() as second:
+        pass
+
+    assert first is second
+    assert len(opened) == 1
+
+
+def test_exhausted_pool_times_out(monkeypatch):
+    """Test that borrowing past max_size raises instead of opening more."""
+    pool = make_pool(monkeypatch, FakeConnection)
+
+    with pool.connection():
+        with pytest.raises(pymysql.err.OperationalError):
+            pool.get_connection()
+
+
+def test_slot_released_when_connect_fails(monkeypatch):
+    """Test that a failed connect does not leak the borrower's slot."""
+    pool = make_pool(monkeypatch, refuse_connection)
+
+    with pytest.raises(pymysql.err.OperationalError):
+        pool.get_connection()
+
+    monkeypatch.setattr(pool, "_connect", FakeConnection)
+    with pool.connection() as connection:
+        assert connection.open
+
+
+def test_slot_released_when_ping_fails(monkeypatch):
+    """Test that a failed ping of a long-idle connection frees its slot."""
+    pool = make_pool(monkeypatch, FakeConnection)
+    stale = BrokenPingConnection()
+    pool._idle.put((stale, time.monotonic() - PING_AFTER_IDLE_SECONDS - 1))
+
+    with pytest.raises(pymysql.err.OperationalError):
+        pool.get_connection()
+
+    with pool.connection() as connection:
+        assert connection is not stale
+
+
+def test_recently_used_connection_is_not_pinged(monkeypatch):
+    """Test that connections idle for less than the threshold skip the ping."""
+    pool = make_pool(monkeypatch, FakeConnection)
+    idle = FakeConnection()
+    pool._idle.put((idle, time.monotonic()))
+
+    with pool.connection() as connection:
+        assert connection is idle
+    assert idle.pings == 0
+
+
+def test_release_rolls_back_open_transaction(monkeypatch):
+    """Test that release() rolls back a transaction the borrower left open."""
+    pool = make_pool(monkeypatch, FakeConnection)
+
+    with pool.connection() as connection:
+        connection.server_status = SERVER_STATUS.SERVER_STATUS_IN_TRANS
+    assert connection.rollbacks == 1
+
+    connection.server_status = 0
+    with pool.connection() as connection:
+        pass
+    assert connection.rollbacks == 1
+
+
+def test_release_drops_closed_connection(monkeypatch):
+    """Test that a connection closed while borrowed is not pooled again."""
+    pool = make_pool(monkeypatch, FakeConnection)
+
+    with pool.connection() as connection:
+        connection.close()
+
+    assert pool._idle.qsize() == 0
+    with pool.connection() as replacement:
+        assert replacement is not connection
+
+
+def test_release_drops_connection_when_rollback_fails(monkeypatch):
+    """Test that a connection whose rollback fails is closed and dropped."""
+    pool = make_pool(monkeypatch, BrokenRollbackConnection)
+
+    with pool.connection() as connection:
+        connection.server_status = SERVER_STATUS.SERVER_STATUS_IN_TRANS
+
+    assert connection.closed
+    assert pool._idle.qsize() == 0
+    with pool.connection() as replacement:
+        assert replacement is not connection
+
+
+def test_prewarm_opens_min_size_connections(monkeypatch):
+    """Test that prewarm fills the idle queue up to min_size."""
+    pool = make_pool(monkeypatch, FakeConnection, min_size=3, max_size=5)
+
+    pool.prewarm()
+    pool.prewarm()
+
+    assert pool._idle.qsize() == 3
+
+
+def test_prewarm_stops_at_first_error(monkeypatch):
+    """Test that prewarm gives up after the first failed connect."""
+    attempts = []
+
+    def connect():
+        attempts.append(None)
+        if len(attempts) == 2:
+            refuse_connection()
+        return FakeConnection()
+
+    pool = make_pool(monkeypatch, connect, min_size=4, max_size=5)
+    pool.prewarm()
+
+    assert len(attempts) == 2
+    assert pool._idle.qsize() == 1
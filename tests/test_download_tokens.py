@@ -0,0 +1,81 @@
+from datetime import datetime, timedelta
+from types import SimpleNamespace
+
+import pytest
+
+from app.core import download_tokens
+from app.core.download_tokens import TokenCache
+from conftest import token_row
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    """Controllable monotonic clock for the cache module."""
+    fake_time = SimpleNamespace(now=1000.0)
+    fake_time.monotonic = lambda: fake_time.now
+    monkeypatch.setattr(download_tokens, "time", fake_time)
+    return fake_time
+
+
+def test_cache_returns_row_within_ttl(clock):
+    """Test that a cached row is served until its TTL runs out."""
+    cache = TokenCache(ttl_seconds=60)
+    row = token_row()
+    cache.set("tok", row)
+
+    clock.now += 59
+    assert cache.get("tok") is row
+
+    clock.now += 1
+    assert cache.get("tok") is None
+
+
+def test_cache_ttl_capped_by_token_expiry(clock):
+    """Test that an entry never outlives the token's own expires_at."""
+    cache = TokenCache(ttl_seconds=60)
+    cache.set("tok", token_row(expires_at=datetime.now() + timedelta(seconds=10)))
+
+    clock.now += 11
+    assert cache.get("tok") is None
+
+
+def test_cache_skips_already_expired_rows(clock):
+    """Test that an expired row is not cached and replaces any older copy."""
+    cache = TokenCache(ttl_seconds=60)
+    cache.set("tok", token_row())
+    cache.set("tok", token_row(expires_at=datetime.now() - timedelta(seconds=1)))
+
+    assert cache.get("tok") is None
+
+
+def test_cache_evicts_oldest_entry_when_full(clock):
+    """Test that inserting past max_entries drops the oldest insertion."""
+    cache = TokenCache(ttl_seconds=60, max_entries=2)
+    cache.set("a", token_row(token="a"))
+    cache.set("b", token_row(token="b"))
+    cache.set("c", token_row(token="c"))
+
+    assert cache.get("a") is None
+    assert cache.get("b")["token"] == "b"
+    assert cache.get("c")["token"] == "c"
+
+
+def test_cache_refresh_of_existing_entry_does_not_evict(clock):
+    """Test that re-setting a cached token does not count as a new entry."""
+    cache = TokenCache(ttl_seconds=60, max_entries=2)
+    cache.set("a", token_row(token="a"))
+    cache.set("b", token_row(token="b"))
+    cache.set("b", token_row(token="b", download_count=2))
+
+    assert cache.get("a") is not None
+    assert cache.get("b")["download_count"] == 2
+
+
+def test_cache_invalidate(clock):
+    """Test that invalidate drops the entry and tolerates unknown tokens."""
+    cache = TokenCache(ttl_seconds=60)
+    cache.set("tok", token_row())
+    cache.invalidate("tok")
+    cache.invalidate("missing")
+
+    assert cache.get("tok") is None
@@ -1,179 +1,211 @@
+from types import MappingProxyType
+from unittest.mock import patch
+
 import pytest
-from fastapi.testclient import TestClient
-from app.main import app
+from app.main import CONFIG_RESPONSE_BODY
 from app.core.config import settings
+from app.core.security import ClientSecretMiddleware
+
+# Secrets are read from settings once for the whole module
+DEFAULT_SECRET = settings.webserver.client_secret
+SITE_SECRETS = dict(settings.webserver.site_secrets)
+
+# Documentation range address, outside the loopback and Docker networks
+# (192.168.0.0/16 is treated as Docker-internal and skips validation)
+PUBLIC_IP = "203.0.113.10"
+
+# "/" is exempt from authentication, so checks target an endpoint that is not
+PROTECTED_PATH = "/config"
+
+# Read-only header templates; tests extend them with {**TEMPLATE, ...}
+LOCALHOST_HEADERS = MappingProxyType({"X-Forwarded-For": "127.0.0.1"})
+EXTERNAL_HEADERS = MappingProxyType({"X-Forwarded-For": PUBLIC_IP})
+
 
-client = TestClient(app)
+def requires_site_secret(site):
+    """Skip a case when the given site has no secret configured."""
+    return pytest.mark.skipif(not SITE_SECRETS.get(site), reason=f"{site} secret not configured")
 
 
-def test_localhost_request_no_auth_required():
+def assert_unauthorized(response):
+    """Assert the middleware rejected the request for a missing or bad secret."""
+    assert response.status_code == 401
+    assert response.json()["detail"] == "Missing or invalid client secret"
+
+
+# (path, headers) pairs that carry a valid secret and must be accepted
+VALID_SECRET_CASES = [
+    pytest.param(
+        PROTECTED_PATH,
+        {**EXTERNAL_HEADERS, "Authorization": f"Bearer {DEFAULT_SECRET}"},
+        id="default-secret-auth-header",
+    ),
+    pytest.param(
+        PROTECTED_PATH,
+        {**EXTERNAL_HEADERS, "X-Client-Secret": DEFAULT_SECRET},
+        id="default-secret-client-secret-header",
+    ),
+    pytest.param(
+        f"{PROTECTED_PATH}?client_secret={DEFAULT_SECRET}",
+        EXTERNAL_HEADERS,
+        id="default-secret-query-param",
+    ),
+    pytest.param(
+        PROTECTED_PATH,
+        {**EXTERNAL_HEADERS, "X-Site": "unknown_site", "X-Client-Secret": DEFAULT_SECRET},
+        id="unknown-site-uses-default-secret",
+    ),
+    pytest.param(
+        PROTECTED_PATH,
+        {**EXTERNAL_HEADERS, "X-Site": "site1", "X-Client-Secret": SITE_SECRETS.get("site1")},
+        id="site1-client-secret-header",
+        marks=requires_site_secret("site1"),
+    ),
+    pytest.param(
+        PROTECTED_PATH,
+        {**EXTERNAL_HEADERS, "X-Site": "site2", "Authorization": f"Bearer {SITE_SECRETS.get('site2')}"},
+        id="site2-auth-header",
+        marks=requires_site_secret("site2"),
+    ),
+    pytest.param(
+        f"{PROTECTED_PATH}?site=site3&client_secret={SITE_SECRETS.get('site3')}",
+        EXTERNAL_HEADERS,
+        id="site3-query-param",
+        marks=requires_site_secret("site3"),
+    ),
+]
+
+# The same channels carrying a wrong secret; each must be rejected
+INVALID_SECRET_CASES = [
+    pytest.param(
+        PROTECTED_PATH,
+        {**EXTERNAL_HEADERS, "Authorization": "Bearer wrong-secret"},
+        id="wrong-secret-auth-header",
+    ),
+    pytest.param(
+        PROTECTED_PATH,
+        {**EXTERNAL_HEADERS, "X-Client-Secret": "wrong-secret"},
+        id="wrong-secret-client-secret-header",
+    ),
+    pytest.param(
+        f"{PROTECTED_PATH}?client_secret=wrong-secret",
+        EXTERNAL_HEADERS,
+        id="wrong-secret-query-param",
+    ),
+    pytest.param(
+        PROTECTED_PATH,
+        {**EXTERNAL_HEADERS, "X-Site": "site2", "Authorization": f"Bearer {SITE_SECRETS.get('site1')}"},
+        id="site2-with-site1-secret",
+        marks=requires_site_secret("site1"),
+    ),
+]
+
+
+def test_localhost_request_no_auth_required(client):
     """Test that localhost requests don't require client secret."""
     # Simulate localhost request
-    response = client.get("/", headers={"X-Forwarded-For": "127.0.0.1"})
+    response = client.get(PROTECTED_PATH, headers=LOCALHOST_HEADERS)
     assert response.status_code == 200
     
 
-def test_external_request_requires_auth():
+def test_external_request_requires_auth(client):
     """Test that external requests require client secret."""
     # Simulate external request without client secret
-    response = client.get("/", headers={"X-Forwarded-For": "192.168.1.100"})
-    assert response.status_code == 401
-    assert "Missing or invalid client secret" in response.text
+    response = client.get(PROTECTED_PATH, headers=EXTERNAL_HEADERS)
+    assert_unauthorized(response)
 
 
-def test_external_request_with_default_client_secret():
-    """Test that external requests with default client secret are allowed."""
-    response = client.get(
-        "/",
-        headers={
-            "X-Forwarded-For": "192.168.1.100",
-            "Authorization": f"Bearer {settings.webserver.client_secret}"
-        }
-    )
+@pytest.mark.parametrize("path,headers", VALID_SECRET_CASES)
+def test_external_request_with_valid_secret(client, path, headers):
+    """Test that external requests carrying a valid secret are allowed."""
+    response = client.get(path, headers=headers)
     assert response.status_code == 200
 
 
-def test_site1_request_with_site_specific_secret():
-    """Test that site1 requests with site-specific secret are allowed."""
-    site1_secret = settings.webserver.site_secrets.get("site1")
-    if site1_secret:
-        response = client.get(
-            "/",
-            headers={
-                "X-Forwarded-For": "192.168.1.100",
-                "X-Site": "site1",
-                "X-Client-Secret": site1_secret
-            }
-        )
-        assert response.status_code == 200
-
-
-def test_site2_request_with_site_specific_secret():
-    """Test that site2 requests with site-specific secret are allowed."""
-    site2_secret = settings.webserver.site_secrets.get("site2")
-    if site2_secret:
-        response = client.get(
-            "/",
-            headers={
-                "X-Forwarded-For": "192.168.1.100",
-                "X-Site": "site2",
-                "Authorization": f"Bearer {site2_secret}"
-            }
-        )
-        assert response.status_code == 200
-
+@pytest.mark.parametrize("path,headers", INVALID_SECRET_CASES)
+def test_external_request_with_wrong_secret(client, path, headers):
+    """Test that external requests carrying a wrong secret are rejected."""
+    response = client.get(path, headers=headers)
+    assert_unauthorized(response)
 
-def test_site3_request_with_site_specific_secret():
-    """Test that site3 requests with site-specific secret are allowed."""
-    site3_secret = settings.webserver.site_secrets.get("site3")
-    if site3_secret:
-        response = client.get(
-            f"/?site=site3&client_secret={site3_secret}",
-            headers={"X-Forwarded-For": "192.168.1.100"}
-        )
-        assert response.status_code == 200
 
-
-def test_site_request_with_wrong_secret():
+def test_site_request_with_wrong_secret(client):
     """Test that site requests with wrong secret are rejected."""
     response = client.get(
-        "/",
+        PROTECTED_PATH,
         headers={
-            "X-Forwarded-For": "192.168.1.100",
+            **EXTERNAL_HEADERS,
             "X-Site": "site1",
             "X-Client-Secret": "wrong-secret"
         }
     )
-    assert response.status_code == 401
-    assert "Missing or invalid client secret" in response.text
+    assert_unauthorized(response)
 
 
-def test_site_request_with_default_secret_should_fail():
+@requires_site_secret("site1")
+@pytest.mark.skipif(SITE_SECRETS.get("site1") == DEFAULT_SECRET, reason="site1 secret equals the default secret")
+def test_site_request_with_default_secret_should_fail(client):
     """Test that site requests with default secret should fail if site has its own secret."""
-    site1_secret = settings.webserver.site_secrets.get("site1")
-    if site1_secret and site1_secret != settings.webserver.client_secret:
-        response = client.get(
-            "/",
-            headers={
-                "X-Forwarded-For": "192.168.1.100",
-                "X-Site": "site1",
-                "X-Client-Secret": settings.webserver.client_secret
-            }
-        )
-        assert response.status_code == 401
-
-
-def test_unknown_site_uses_default_secret():
-    """Test that unknown sites use the default client secret."""
-    response = client.get(
-        "/",
-        headers={
-            "X-Forwarded-For": "192.168.1.100",
-            "X-Site": "unknown_site",
-            "X-Client-Secret": settings.webserver.client_secret
-        }
-    )
-    assert response.status_code == 200
-
-
-def test_external_request_with_valid_auth_header():
-    """Test that external requests with valid Authorization header are allowed."""
     response = client.get(
-        "/",
+        PROTECTED_PATH,
         headers={
-            "X-Forwarded-For": "192.168.1.100",
-            "Authorization": f"Bearer {settings.webserver.client_secret}"
+            **EXTERNAL_HEADERS,
+            "X-Site": "site1",
+            "X-Client-Secret": DEFAULT_SECRET
         }
     )
-    assert response.status_code == 200
+    assert_unauthorized(response)
 
 
-def test_external_request_with_valid_client_secret_header():
-    """Test that external requests with valid X-Client-Secret header are allowed."""
-    response = client.get(
-        "/",
-        headers={
-            "X-Forwarded-For": "192.168.1.100",
-            "X-Client-Secret": settings.webserver.client_secret
-        }
-    )
-    assert response.status_code == 200
-
-
-def test_external_request_with_valid_query_param():
-    """Test that external requests with valid client_secret query parameter are allowed."""
-    response = client.get(
-        f"/?client_secret={settings.webserver.client_secret}",
-        headers={"X-Forwarded-For": "192.168.1.100"}
-    )
-    assert response.status_code == 200
-
-
-def test_external_request_with_invalid_client_secret():
+def test_external_request_with_invalid_client_secret(client):
     """Test that external requests with invalid client secret are rejected."""
     response = client.get(
-        "/",
+        PROTECTED_PATH,
         headers={
-            "X-Forwarded-For": "192.168.1.100",
+            **EXTERNAL_HEADERS,
             "X-Client-Secret": "invalid-secret"
         }
     )
-    assert response.status_code == 401
-    assert "Missing or invalid client secret" in response.text
+    assert_unauthorized(response)
 
 
-def test_config_endpoint_security():
+def test_config_endpoint_security(client):
     """Test that the config endpoint also requires authentication for external requests."""
     # External request without auth should fail
-    response = client.get("/config", headers={"X-Forwarded-For": "192.168.1.100"})
-    assert response.status_code == 401
+    response = client.get("/config", headers=EXTERNAL_HEADERS)
+    assert_unauthorized(response)
     
     # External request with valid auth should succeed
     response = client.get(
         "/config",
         headers={
-            "X-Forwarded-For": "192.168.1.100",
-            "X-Client-Secret": settings.webserver.client_secret
+            **EXTERNAL_HEADERS,
+            "X-Client-Secret": DEFAULT_SECRET
         }
     )
     assert response.status_code == 200
+
+
+def test_secret_compared_once_per_request(client):
+    """Test that each authenticated request runs exactly one secret comparison."""
+    headers = {**EXTERNAL_HEADERS, "X-Client-Secret": DEFAULT_SECRET}
+    with patch.object(
+        ClientSecretMiddleware,
+        "secrets_match",
+        autospec=True,
+        side_effect=ClientSecretMiddleware.secrets_match
+    ) as secrets_match:
+        for _ in range(3):
+            response = client.get("/config", headers=headers)
+            assert response.status_code == 200
+    assert secrets_match.call_count == 3
+
+
+def test_config_endpoint_serves_cached_body(client):
+    """Test that authenticated config requests all get the body serialized at startup."""
+    headers = {**EXTERNAL_HEADERS, "X-Client-Secret": DEFAULT_SECRET}
+    for _ in range(10):
+        response = client.get("/config", headers=headers)
+        assert response.status_code == 200
+        assert response.content == CONFIG_RESPONSE_BODY
+    assert response.json() == settings.model_dump(mode="json")
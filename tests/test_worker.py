@@ -0,0 +1,167 @@
+import time
+from datetime import datetime, timedelta
+
+import anyio
+import httpx
+
+from app import worker
+from app.core.db_pool import ConnectionPool
+from app.core.download_tokens import SQL_QUERIES, token_cache
+from app.main import app
+from conftest import FakeConnection, token_row
+
+LOCALHOST_HEADERS = {"X-Forwarded-For": "127.0.0.1"}
+
+
+def test_rejected_download_drops_cached_token(client, fake_db):
+    """Test that a download the UPDATE refuses also evicts the cached row."""
+    exhausted = token_row(download_count=3, max_downloads=3, status="expired")
+
+    def handler(sql, params):
+        if sql == SQL_QUERIES["record_download"]:
+            return 0, []
+        if sql == SQL_QUERIES["get_token"]:
+            return 1, [exhausted]
+        raise AssertionError(f"unexpected query: {sql}")
+
+    fake_db.handler = handler
+    token_cache.set("tok", token_row())
+
+    response = client.post("/worker/record_download/tok", headers=LOCALHOST_HEADERS)
+
+    assert response.status_code == 403
+    assert token_cache.get("tok") is None
+
+
+def test_recorded_download_drops_cached_token(client, fake_db):
+    """Test that a successful download evicts the cached row as well."""
+    def handler(sql, params):
+        if sql == SQL_QUERIES["record_download"]:
+            return 1, []
+        if sql == SQL_QUERIES["get_token"]:
+            return 1, [token_row(download_count=2)]
+        raise AssertionError(f"unexpected query: {sql}")
+
+    fake_db.handler = handler
+    token_cache.set("tok", token_row())
+
+    response = client.post("/worker/record_download/tok", headers=LOCALHOST_HEADERS)
+
+    assert response.status_code == 200
+    assert response.json()["download_count"] == 2
+    assert token_cache.get("tok") is None
+
+
+def serve_token(fake_db, row):
+    """Answer token lookups with row and start from an empty cache."""
+    token_cache.invalidate(row["token"])
+    fake_db.handler = lambda sql, params: (1, [row])
+
+
+def test_validate_token_sets_etag(client, fake_db):
+    """Test that a validation response carries a weak ETag."""
+    serve_token(fake_db, token_row())
+
+    response = client.get("/worker/validate_token/tok", headers=LOCALHOST_HEADERS)
+
+    assert response.status_code == 200
+    assert response.json()["valid"] is True
+    assert response.headers["ETag"].startswith('W/"')
+    assert response.headers["Cache-Control"] == "no-cache"
+
+
+def test_validate_token_matching_etag_returns_304(client, fake_db):
+    """Test that If-None-Match with the current tag gets an empty 304."""
+    serve_token(fake_db, token_row())
+    etag = client.get("/worker/validate_token/tok", headers=LOCALHOST_HEADERS).headers["ETag"]
+
+    response = client.get(
+        "/worker/validate_token/tok",
+        headers={**LOCALHOST_HEADERS, "If-None-Match": etag},
+    )
+
+    assert response.status_code == 304
+    assert response.headers["ETag"] == etag
+    assert response.content == b""
+
+
+def test_validate_token_etag_in_list_returns_304(client, fake_db):
+    """Test that a comma-separated If-None-Match containing the tag gets 304."""
+    serve_token(fake_db, token_row())
+    etag = client.get("/worker/validate_token/tok", headers=LOCALHOST_HEADERS).headers["ETag"]
+
+    response = client.get(
+        "/worker/validate_token/tok",
+        headers={**LOCALHOST_HEADERS, "If-None-Match": f'W/"stale", {etag}'},
+    )
+
+    assert response.status_code == 304
+
+
+def test_validate_token_stale_etag_returns_body(client, fake_db):
+    """Test that a non-matching If-None-Match gets the full response."""
+    serve_token(fake_db, token_row())
+
+    response = client.get(
+        "/worker/validate_token/tok",
+        headers={**LOCALHOST_HEADERS, "If-None-Match": 'W/"stale"'},
+    )
+
+    assert response.status_code == 200
+    assert response.json()["valid"] is True
+
+
+def test_validate_token_etag_tracks_token_state(client, fake_db):
+    """Test that the tag changes with download_count, status and validity."""
+    variants = [
+        token_row(),
+        token_row(download_count=2),
+        token_row(status="disabled"),
+        # Same count and status as the first row, but no longer valid
+        token_row(expires_at=datetime.now() - timedelta(minutes=1)),
+    ]
+    etags = []
+    for row in variants:
+        serve_token(fake_db, row)
+        response = client.get("/worker/validate_token/tok", headers=LOCALHOST_HEADERS)
+        assert response.status_code == 200
+        etags.append(response.headers["ETag"])
+
+    assert len(set(etags)) == len(etags)
+
+
+def test_more_requests_than_threads_and_connections(monkeypatch):
+    """
+    Test that requests outnumbering both the threadpool and the pool complete.
+    A handler waiting for a connection must not hold a thread that another
+    request needs to hand its connection back.
+    """
+    def slow_connect():
+        time.sleep(0.05)
+        return FakeConnection(lambda sql, params: (1, []))
+
+    pool = ConnectionPool(min_size=0, max_size=2, acquire_timeout=2)
+    monkeypatch.setattr(pool, "_connect", slow_connect)
+    monkeypatch.setattr(worker, "db_pool", pool)
+
+    async def main():
+        anyio.to_thread.current_default_thread_limiter().total_tokens = 4
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://test") as http:
+            responses = []
+
+            async def create_job(i):
+                responses.append(await http.post(
+                    "/worker/create_job",
+                    json={"user_email": f"user{i}@example.com", "file_name": "f.txt"},
+                    headers=LOCALHOST_HEADERS,
+                ))
+
+            async with anyio.create_task_group() as tg:
+                for i in range(24):
+                    tg.start_soon(create_job, i)
+        return responses
+
+    responses = anyio.run(main)
+
+    assert [r.status_code for r in responses] == [200] * 24